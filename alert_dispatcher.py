@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+
+
+class AlertDispatcher:
+    """
+    Delivers speeding events to an HTTP collector from a background thread.
+
+    submit() never blocks the detection loop: events go into a bounded
+    in-memory queue and, when it is full, the oldest are moved aside to be
+    written to the on-disk spool by the worker. That hand-off is bounded too
+    (overflow_size, by default queue_size): while the worker is stuck in a
+    slow POST, events beyond it are dropped and counted. The worker POSTs events as a
+    JSON batch ({"events": [...]}); when the collector is unreachable the batch
+    is spooled and delivery is retried with exponential backoff, replaying the
+    spool once the collector answers again.
+    """
+
+    def __init__(self, url, queue_size=256, batch_size=20, batch_wait=0.5, timeout=2.0,
+                 backoff=1.0, backoff_max=60.0, spool_path="Results/alert_spool.jsonl", overflow_size=None):
+        self.url = url
+        self.queue_size = max(1, int(queue_size))
+        self.overflow_size = max(1, int(overflow_size or queue_size))
+        self.batch_size = max(1, int(batch_size))
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+        self.backoff_initial = backoff
+        self.backoff_max = backoff_max
+        self.spool_path = spool_path
+
+        self.sent = 0
+        self.failures = 0
+        self.spooled = 0
+        self.overflowed = 0
+        self.dropped = 0
+
+        self._items = deque()
+        self._overflow = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._backoff = backoff
+        self._retry_at = 0.0
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            # Events spooled by an earlier run are replayed once the collector answers
+            try:
+                with open(self.spool_path) as f:
+                    self.spooled = sum(1 for line in f if line.strip())
+            except FileNotFoundError:
+                pass
+            self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, event):
+        with self._cond:
+            if len(self._items) >= self.queue_size:
+                if len(self._overflow) >= self.overflow_size:
+                    self._overflow.popleft()
+                    self.dropped += 1
+                self._overflow.append(self._items.popleft())
+                self.overflowed += 1
+            self._items.append(event)
+            self._cond.notify()
+
+    @property
+    def queue_depth(self):
+        return len(self._items)
+
+    def close(self, timeout=5.0):
+        """Stops the worker after one last delivery attempt; anything undelivered is spooled."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def summary(self):
+        return (f"sent {self.sent}, queued {self.queue_depth}, spooled {self.spooled}, "
+                f"failed attempts {self.failures}, overflowed {self.overflowed}, dropped {self.dropped}")
+
+    def _next_batch(self):
+        """Waits for events and collects up to batch_size of them, lingering batch_wait to fill the batch."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._overflow or self._closed, self.batch_wait)
+            if self._items and len(self._items) < self.batch_size and not self._closed:
+                self._cond.wait_for(lambda: len(self._items) >= self.batch_size or self._closed,
+                                    self.batch_wait)
+            batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+            overflow = list(self._overflow)
+            self._overflow.clear()
+            return batch, overflow, self._closed and not self._items
+
+    def _run(self):
+        while True:
+            batch, overflow, finished = self._next_batch()
+            if overflow:
+                self._spool(overflow)
+            if batch and not self._deliver(batch, force=finished):
+                self._spool(batch)
+            elif self.spooled and time.monotonic() >= self._retry_at:
+                self._replay_spool()
+            if finished:
+                break
+
+    def _post(self, events):
+        body = json.dumps({'events': events}).encode()
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return 200 <= response.status < 300
+        except (urllib.error.URLError, OSError, ValueError):
+            return False
+
+    def _deliver(self, events, force=False):
+        """POSTs one batch unless still backing off; adjusts the backoff from the outcome."""
+        if not force and time.monotonic() < self._retry_at:
+            return False
+        if self._post(events):
+            self.sent += len(events)
+            self._backoff = self.backoff_initial
+            self._retry_at = 0.0
+            return True
+        self.failures += 1
+        self._retry_at = time.monotonic() + self._backoff
+        self._backoff = min(self._backoff * 2, self.backoff_max)
+        return False
+
+    def _spool(self, events):
+        os.makedirs(os.path.dirname(self.spool_path) or '.', exist_ok=True)
+        with open(self.spool_path, 'a') as f:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+        self.spooled += len(events)
+
+    def _replay_spool(self):
+        try:
+            with open(self.spool_path) as f:
+                events = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            self.spooled = 0
+            return
+        delivered = 0
+        while delivered < len(events):
+            batch = events[delivered:delivered + self.batch_size]
+            if not self._deliver(batch):
+                break
+            delivered += len(batch)
+        remaining = events[delivered:]
+        # Rewrite via rename so a crash mid-replay never loses the spool
+        tmp_path = self.spool_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for event in remaining:
+                f.write(json.dumps(event) + '\n')
+        os.replace(tmp_path, self.spool_path)
+        self.spooled = len(remaining)
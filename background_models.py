@@ -0,0 +1,132 @@
+import cv2
+import numpy as np
+
+# Parameters of each engine; config "background_params" overrides them per engine
+DEFAULT_PARAMS = {
+    'mog2': {'history': 300, 'varThreshold': 24, 'detectShadows': False},
+    'knn': {'history': 300, 'dist2Threshold': 400.0, 'detectShadows': False},
+    'running_average': {'alpha': 0.02, 'threshold': 25},
+    'median': {'samples': 15, 'sample_interval': 10, 'update_interval': 30, 'threshold': 25}
+}
+
+
+class _GrayBackground:
+    """
+    Shared plumbing for the single-channel engines: gray conversion and the
+    |frame - background| > threshold foreground mask, all into reused buffers.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self._shape = None
+
+    def _allocate(self, gray):
+        height, width = gray.shape
+        self._diff = np.empty((height, width), np.uint8)
+        self._fg = np.empty((height, width), np.uint8)
+        self.background = gray.copy()
+
+    def _gray(self, image):
+        if image.ndim == 2:
+            return image
+        if self._shape != image.shape:
+            self._gray_buf = np.empty(image.shape[:2], np.uint8)
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self._gray_buf)
+
+    def apply(self, image, fgmask=None):
+        """Same contract as OpenCV's subtractors: returns (and fills) a 0/255 mask."""
+        gray = self._gray(image)
+        first = self._shape != image.shape
+        if first:
+            # The first frame (or a new zone size) becomes the background
+            self._allocate(gray)
+            self._shape = image.shape
+        if fgmask is None:
+            fgmask = self._fg
+        if first:
+            fgmask[:] = 0
+            return fgmask
+
+        cv2.absdiff(gray, self.background, dst=self._diff)
+        cv2.threshold(self._diff, self.threshold, 255, cv2.THRESH_BINARY, dst=fgmask)
+        self._learn(gray)
+        return fgmask
+
+
+class RunningAverageBackground(_GrayBackground):
+    """
+    Exponentially weighted running average of the gray frame. A single
+    multiply-add per pixel, so far cheaper than MOG2 on small boards, at the
+    cost of slower recovery from sudden lighting changes.
+    """
+
+    def __init__(self, alpha=0.02, threshold=25):
+        super().__init__(threshold)
+        self.alpha = alpha
+
+    def _allocate(self, gray):
+        super()._allocate(gray)
+        self._model = gray.astype(np.float32)
+
+    def _learn(self, gray):
+        cv2.accumulateWeighted(gray, self._model, self.alpha)
+        cv2.convertScaleAbs(self._model, dst=self.background)
+
+
+class MedianBackground(_GrayBackground):
+    """
+    Per-pixel median of a ring of past frames sampled every sample_interval
+    frames. The median over the samples is the expensive part, so it is
+    refreshed one horizontal band per frame and the whole background every
+    update_interval frames: each frame pays a difference, a threshold and
+    1/update_interval of a full median, with no periodic stall.
+    """
+
+    def __init__(self, samples=15, sample_interval=10, update_interval=30, threshold=25):
+        super().__init__(threshold)
+        self.samples = max(1, int(samples))
+        self.sample_interval = max(1, int(sample_interval))
+        self.update_interval = max(1, int(update_interval))
+
+    def _allocate(self, gray):
+        super()._allocate(gray)
+        self._ring = np.repeat(gray[np.newaxis], self.samples, axis=0)
+        self._bands = np.linspace(0, gray.shape[0], self.update_interval + 1).astype(int)
+        self._next = 0
+        self._frames = 0
+
+    def _learn(self, gray):
+        self._frames += 1
+        if self._frames % self.sample_interval == 0:
+            self._ring[self._next] = gray
+            self._next = (self._next + 1) % self.samples
+        band = self._frames % self.update_interval
+        top, bottom = self._bands[band], self._bands[band + 1]
+        if top < bottom:
+            self.background[top:bottom] = np.median(self._ring[:, top:bottom], axis=0)
+
+
+ENGINES = {
+    'mog2': cv2.createBackgroundSubtractorMOG2,
+    'knn': cv2.createBackgroundSubtractorKNN,
+    'running_average': RunningAverageBackground,
+    'median': MedianBackground
+}
+
+
+def background_params(name, overrides=None):
+    """Effective parameters of an engine: its defaults updated with overrides."""
+    if name not in ENGINES:
+        raise ValueError(f"Unknown background model '{name}' (choose from {', '.join(ENGINES)})")
+    params = dict(DEFAULT_PARAMS[name])
+    params.update(overrides or {})
+    return params
+
+
+def create_background_model(name, params=None):
+    """
+    Builds a background model by name. Every engine has OpenCV's
+    apply(image, fgmask) interface and produces a 0/255 foreground mask
+    (as long as shadow detection stays off for mog2/knn).
+    """
+    return ENGINES[name](**background_params(name, params))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Compares background model engines on a recorded video.
+
+Usage: python3 compare_backgrounds.py Videos/clip.mp4 [engine ...]
+
+Every engine runs headless over the same video. Real clips have no ground
+truth, so detections are matched against the MOG2 run the same way
+compare_scales.py matches scales: recall and precision relative to MOG2,
+speed drift, box overlap and throughput.
+"""
+import json
+import os
+import sys
+import time
+
+from background_models import ENGINES, background_params
+from compare_scales import compare, _fmt
+from speed_detection import SpeedCameraSystem
+
+
+def run_with_engine(video_path, engine):
+    system = SpeedCameraSystem()
+    system.background_model = engine
+    system.background_params = background_params(engine, system.config['background_params'].get(engine))
+    system.reset_detection_state()
+    start_time = time.perf_counter()
+    results = system.process_video_segment(video_path, 0.0)
+    elapsed = time.perf_counter() - start_time
+    if results is None:
+        raise SystemExit(f"Error: Could not open '{video_path}'")
+    results['processing_s'] = elapsed
+    return results
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    video_path = sys.argv[1]
+    engines = sys.argv[2:] or [e for e in ENGINES if e != 'mog2']
+    for engine in engines:
+        if engine not in ENGINES:
+            raise SystemExit(f"Unknown engine '{engine}' (choose from {', '.join(ENGINES)})")
+
+    reference = run_with_engine(video_path, 'mog2')
+    report = {'video': video_path, 'engines': {'mog2': compare(reference, reference)}}
+    for engine in engines:
+        if engine != 'mog2':
+            report['engines'][engine] = compare(reference, run_with_engine(video_path, engine))
+
+    print(f"{'engine':>16} {'fps':>8} {'dets':>6} {'recall':>7} {'prec':>7} "
+          f"{'bias':>7} {'mae':>7} {'iou':>6}")
+    for engine, row in report['engines'].items():
+        print(f"{engine:>16} {row['fps']:8.1f} {row['detections']:6d} "
+              f"{_fmt(row['recall'], '7.2f')} {_fmt(row['precision'], '7.2f')} "
+              f"{_fmt(row['speed_bias_mph'], '7.2f')} {_fmt(row['speed_mae_mph'], '7.2f')} "
+              f"{_fmt(row['mean_iou'], '6.2f')}")
+
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    report_path = os.path.join("Results", f"{name}_backgrounds.json")
+    os.makedirs("Results", exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compares detection accuracy at reduced analysis scales against full resolution.
+
+Usage: python3 compare_scales.py Videos/clip.mp4 [scale ...]
+
+Every scale runs headless over the same video. Detections are matched to the
+full-resolution run by frame and bounding-box overlap; the report shows how many full-resolution
+detections were kept (recall), how many new ones appeared (precision), how far
+the speeds drift and how well the bounding boxes overlap.
+"""
+import json
+import os
+import sys
+import time
+
+from speed_detection import SpeedCameraSystem
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+def run_at_scale(video_path, scale):
+    system = SpeedCameraSystem()
+    system.analysis_scale = scale
+    system.reset_detection_state()
+    start_time = time.perf_counter()
+    results = system.process_video_segment(video_path, 0.0)
+    elapsed = time.perf_counter() - start_time
+    if results is None:
+        raise SystemExit(f"Error: Could not open '{video_path}'")
+    results['processing_s'] = elapsed
+    return results
+
+
+def _by_frame(detections):
+    frames = {}
+    for d in detections:
+        frames.setdefault(d['frame'], []).append(d)
+    return frames
+
+
+def compare(reference, candidate):
+    ref_by_frame = _by_frame(reference['detections'])
+    cand_by_frame = _by_frame(candidate['detections'])
+
+    # Within a frame, pair each reference vehicle with the best-overlapping candidate
+    speed_errors = []
+    ious = []
+    for frame in ref_by_frame.keys() & cand_by_frame.keys():
+        unused = list(cand_by_frame[frame])
+        for ref in ref_by_frame[frame]:
+            if not unused:
+                break
+            best = max(unused, key=lambda d: _iou(d['bounding_box'], ref['bounding_box']))
+            overlap = _iou(best['bounding_box'], ref['bounding_box'])
+            if overlap == 0.0:
+                continue
+            unused.remove(best)
+            speed_errors.append(best['speed_mph'] - ref['speed_mph'])
+            ious.append(overlap)
+
+    ref_count = len(reference['detections'])
+    cand_count = len(candidate['detections'])
+    return {
+        'detections': cand_count,
+        'recall': len(ious) / ref_count if ref_count else None,
+        'precision': len(ious) / cand_count if cand_count else None,
+        'speed_bias_mph': sum(speed_errors) / len(speed_errors) if speed_errors else None,
+        'speed_mae_mph': sum(abs(e) for e in speed_errors) / len(speed_errors) if speed_errors else None,
+        'mean_iou': sum(ious) / len(ious) if ious else None,
+        'fps': candidate['frames'] / max(candidate['processing_s'], 1e-6)
+    }
+
+
+def _fmt(value, spec):
+    if value is None:
+        return "-".rjust(int(spec.split('.')[0]))
+    return format(value, spec)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    video_path = sys.argv[1]
+    scales = [float(s) for s in sys.argv[2:]] or [0.5, 0.25]
+
+    reference = run_at_scale(video_path, 1.0)
+    report = {'video': video_path, 'scales': {'1.0': compare(reference, reference)}}
+    for scale in scales:
+        report['scales'][str(scale)] = compare(reference, run_at_scale(video_path, scale))
+
+    print(f"{'scale':>6} {'fps':>8} {'dets':>6} {'recall':>7} {'prec':>7} "
+          f"{'bias':>7} {'mae':>7} {'iou':>6}")
+    for scale, row in report['scales'].items():
+        print(f"{scale:>6} {row['fps']:8.1f} {row['detections']:6d} "
+              f"{_fmt(row['recall'], '7.2f')} {_fmt(row['precision'], '7.2f')} "
+              f"{_fmt(row['speed_bias_mph'], '7.2f')} {_fmt(row['speed_mae_mph'], '7.2f')} "
+              f"{_fmt(row['mean_iou'], '6.2f')}")
+
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    report_path = os.path.join("Results", f"{name}_scales.json")
+    os.makedirs("Results", exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
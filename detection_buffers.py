@@ -0,0 +1,44 @@
+import numpy as np
+
+
+class DetectionBuffers:
+    """
+    Reusable intermediate images for one detection-zone size.
+
+    Every stage of _process_frame writes into these through OpenCV's dst=
+    outputs, so steady-state frames allocate no image memory. The blurred gray
+    frame is double-buffered: the current frame is written into one buffer
+    while the other still holds prev_frame.
+    """
+
+    def __init__(self, height, width, channels):
+        self.shape = (height, width, channels)
+        color_shape = (height, width, channels) if channels > 1 else (height, width)
+        self.small = np.empty(color_shape, np.uint8)
+        self.fg_mask = np.empty((height, width), np.uint8)
+        self.opened = np.empty((height, width), np.uint8)
+        self.gray = np.empty((height, width), np.uint8)
+        self.blurred = (np.empty((height, width), np.uint8), np.empty((height, width), np.uint8))
+        self.diff = np.empty((height, width), np.uint8)
+        self.thresh = np.empty((height, width), np.uint8)
+        self.labels = np.empty((height, width), np.int32)
+        self._current = 0
+
+    def next_blurred(self):
+        """Returns the blurred-gray buffer that does not hold prev_frame."""
+        self._current ^= 1
+        return self.blurred[self._current]
+
+
+class BufferPool:
+    """Hands out DetectionBuffers for the current zone size, reallocating only when it changes."""
+
+    def __init__(self):
+        self.buffers = None
+        self.allocations = 0
+
+    def get(self, height, width, channels):
+        if self.buffers is None or self.buffers.shape != (height, width, channels):
+            self.buffers = DetectionBuffers(height, width, channels)
+            self.allocations += 1
+        return self.buffers
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import deque
+
+
+class DropOldestQueue:
+    """Bounded hand-off between pipeline stages that never blocks the producer.
+
+    When the queue is full the oldest item is discarded so the consumer
+    always works on the freshest frame available.
+    """
+
+    def __init__(self, maxsize=2):
+        self.maxsize = max(1, int(maxsize))
+        self.dropped = 0
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Returns the next item, or None on timeout or once the queue is closed and empty."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed, timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def qsize(self):
+        return len(self._items)
+
+
+class PipelineStats:
+    """Frame counters for the capture / detection / render pipeline.
+
+    Each counter is only written by the stage that owns it, so no locking
+    is needed for the increments.
+    """
+
+    def __init__(self, late_threshold):
+        self.late_threshold = late_threshold
+        self.captured = 0
+        self.processed = 0
+        self.rendered = 0
+        self.late = 0
+        # Frames overwritten in the shared ring before detection finished reading them
+        self.torn = 0
+        self.dropped_before_detection = 0
+        self.dropped_before_render = 0
+        self.start_time = time.perf_counter()
+
+    def record_render(self, capture_time):
+        self.rendered += 1
+        if time.perf_counter() - capture_time > self.late_threshold:
+            self.late += 1
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.start_time, 1e-6)
+        return (
+            f"captured {self.captured} ({self.captured / elapsed:.1f} fps), "
+            f"processed {self.processed} ({self.processed / elapsed:.1f} fps), "
+            f"rendered {self.rendered} ({self.rendered / elapsed:.1f} fps), "
+            f"dropped {self.dropped_before_detection} before detection / "
+            f"{self.dropped_before_render} before render, "
+            f"late {self.late}, torn {self.torn}"
+        )
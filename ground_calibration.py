@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+
+
+class GroundPlaneCalibration:
+    """
+    Image-to-road-plane mapping from a homography fitted to four or more marked
+    points with known road coordinates (meters).
+
+    The mapping is expanded once into a dense per-pixel lookup table, so
+    converting blob positions to meters at run time is a single array index.
+    """
+
+    def __init__(self, homography, frame_size, image_points=None, world_points=None, lut=None):
+        self.homography = np.asarray(homography, np.float64)
+        self.frame_size = tuple(int(v) for v in frame_size)
+        self.image_points = np.asarray(image_points if image_points is not None else [], np.float64)
+        self.world_points = np.asarray(world_points if world_points is not None else [], np.float64)
+        self.lut = lut if lut is not None else self._build_lut()
+
+    @classmethod
+    def from_points(cls, image_points, world_points, frame_size):
+        image_points = np.asarray(image_points, np.float64)
+        world_points = np.asarray(world_points, np.float64)
+        if len(image_points) < 4 or len(image_points) != len(world_points):
+            raise ValueError("At least four image points with matching road coordinates are required")
+        method = cv2.RANSAC if len(image_points) > 4 else 0
+        homography, _ = cv2.findHomography(image_points, world_points, method)
+        if homography is None:
+            raise ValueError("Points are degenerate; mark points that are not collinear")
+        return cls(homography, frame_size, image_points, world_points)
+
+    def _build_lut(self):
+        width, height = self.frame_size
+        xs, ys = np.meshgrid(np.arange(width, dtype=np.float64), np.arange(height, dtype=np.float64))
+        h = self.homography
+        denom = h[2, 0] * xs + h[2, 1] * ys + h[2, 2]
+        lut = np.empty((height, width, 2), np.float32)
+        lut[..., 0] = (h[0, 0] * xs + h[0, 1] * ys + h[0, 2]) / denom
+        lut[..., 1] = (h[1, 0] * xs + h[1, 1] * ys + h[1, 2]) / denom
+        return lut
+
+    def to_world(self, points):
+        """Maps Nx2 image points (x, y) to Nx2 road-plane meters."""
+        points = np.asarray(points)
+        if not len(points):
+            return np.empty((0, 2), np.float64)
+        width, height = self.frame_size
+        ix = np.clip(np.rint(points[:, 0]).astype(np.intp), 0, width - 1)
+        iy = np.clip(np.rint(points[:, 1]).astype(np.intp), 0, height - 1)
+        return self.lut[iy, ix].astype(np.float64)
+
+    def reprojection_error(self):
+        """RMS distance in meters between the marked road points and their mapped image points."""
+        if not len(self.image_points):
+            return None
+        mapped = cv2.perspectiveTransform(self.image_points.reshape(-1, 1, 2), self.homography).reshape(-1, 2)
+        return float(np.sqrt(((mapped - self.world_points) ** 2).sum(axis=1).mean()))
+
+    def save(self, path):
+        np.savez_compressed(path, homography=self.homography, frame_size=np.array(self.frame_size),
+                            image_points=self.image_points, world_points=self.world_points, lut=self.lut)
+
+    @classmethod
+    def load(cls, path, frame_size=None):
+        """
+        Loads a cached calibration. If it was made at a different frame size the
+        homography is rescaled to the new pixel grid and the lookup table rebuilt.
+        """
+        with np.load(path) as data:
+            homography = data['homography']
+            image_points = data['image_points']
+            saved_size = tuple(int(v) for v in data['frame_size'])
+            if frame_size is None or tuple(frame_size) == saved_size:
+                return cls(homography, saved_size, image_points, data['world_points'], data['lut'])
+
+            sx = saved_size[0] / frame_size[0]
+            sy = saved_size[1] / frame_size[1]
+            homography = homography @ np.diag([sx, sy, 1.0])
+            if len(image_points):
+                image_points = image_points / np.array([sx, sy])
+            return cls(homography, frame_size, image_points, data['world_points'])
@@ -0,0 +1,67 @@
+import math
+
+
+class ConstantVelocityKalman:
+    """
+    Constant-velocity Kalman filter for an image-plane centroid.
+
+    Each axis has an independent (position, velocity) state, so the update is a
+    handful of scalar operations and cheap enough to run for every tracked
+    vehicle. Positions are in pixels. accel_std is given in m/s^2 and scaled by
+    the current px/m so the filter behaves the same near and far;
+    measurement_std is used as given, in position units (pixels, from
+    kalman_measurement_std_px). With road-plane positions in meters,
+    px_per_meter is simply 1 and measurement_std is in meters
+    (kalman_measurement_std_m).
+    """
+
+    def __init__(self, cx, cy, px_per_meter, accel_std=3.0, measurement_std=4.0, max_speed=60.0):
+        self.accel_std = accel_std
+        self.measurement_var = measurement_std * measurement_std
+        # Per axis: [position, velocity] and covariance [[p00, p01], [p01, p11]]
+        initial_vel_var = (max_speed * px_per_meter) ** 2
+        self.x = [float(cx), 0.0, self.measurement_var, 0.0, initial_vel_var]
+        self.y = [float(cy), 0.0, self.measurement_var, 0.0, initial_vel_var]
+        self.updates = 1
+
+    def _predict_axis(self, s, dt, q):
+        p, v, p00, p01, p11 = s
+        dt2 = dt * dt
+        s[0] = p + v * dt
+        s[2] = p00 + 2 * dt * p01 + dt2 * p11 + q * dt2 * dt / 3
+        s[3] = p01 + dt * p11 + q * dt2 / 2
+        s[4] = p11 + q * dt
+
+    def _update_axis(self, s, z):
+        p, v, p00, p01, p11 = s
+        innovation_var = p00 + self.measurement_var
+        k0 = p00 / innovation_var
+        k1 = p01 / innovation_var
+        residual = z - p
+        s[0] = p + k0 * residual
+        s[1] = v + k1 * residual
+        s[2] = (1 - k0) * p00
+        s[3] = (1 - k0) * p01
+        s[4] = p11 - k1 * p01
+
+    def step(self, dt, cx, cy, px_per_meter):
+        """Advances the state by dt seconds and folds in a centroid measurement."""
+        q = (self.accel_std * px_per_meter) ** 2
+        for s, z in ((self.x, cx), (self.y, cy)):
+            self._predict_axis(s, dt, q)
+            self._update_axis(s, float(z))
+        self.updates += 1
+
+    @property
+    def velocity(self):
+        return self.x[1], self.y[1]
+
+    def speed(self, px_per_meter):
+        """Returns (speed, standard deviation) in m/s."""
+        vx, vy = self.x[1], self.y[1]
+        speed_sq = vx * vx + vy * vy
+        if speed_sq == 0.0:
+            return 0.0, math.sqrt(max(self.x[4], self.y[4])) / px_per_meter
+        # First-order propagation of the velocity variances through |v|
+        var = (vx * vx * self.x[4] + vy * vy * self.y[4]) / speed_sq
+        return math.sqrt(speed_sq) / px_per_meter, math.sqrt(var) / px_per_meter
@@ -0,0 +1,166 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+_PAGE = b"""<!DOCTYPE html>
+<html><head><title>Speed Camera</title></head>
+<body style="margin:0;background:#000">
+<img src="/stream.mjpg" style="width:100%;height:auto">
+</body></html>
+"""
+
+_BOUNDARY = b"frame"
+
+
+class LiveViewServer:
+    """
+    Serves the annotated output as an MJPEG stream over HTTP, replacing the
+    local window on headless poles.
+
+    publish() is called from the render loop with each display frame. It
+    returns immediately when nobody is watching or the frame is ahead of the
+    configured rate; otherwise it hands the frame to an encoder thread that
+    JPEG-encodes it once for all viewers. Each viewer thread sends only the
+    newest encoded frame, so a slow client skips frames instead of holding
+    anything up. A /snapshot.jpg request counts as a viewer until the next
+    frame is encoded, so it always gets a current frame.
+    """
+
+    def __init__(self, host="0.0.0.0", port=8080, fps=10.0, quality=70):
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.quality = int(quality)
+        self.clients = 0
+        self.encoded = 0
+
+        self._cond = threading.Condition()
+        self._pending = None
+        self._jpeg = None
+        self._seq = 0
+        self._last_publish = 0.0
+        self._running = False
+        self._server = None
+        self._threads = []
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path in ('/', '/index.html'):
+                    self._send(b'text/html', _PAGE)
+                elif self.path.startswith('/stream.mjpg'):
+                    server._stream(self)
+                elif self.path.startswith('/snapshot.jpg'):
+                    jpeg = server._snapshot()
+                    if jpeg is None:
+                        self.send_error(503, "No frame available")
+                    else:
+                        self._send(b'image/jpeg', jpeg)
+                else:
+                    self.send_error(404)
+
+            def _send(self, content_type, body):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type.decode())
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, name="live-view-http", daemon=True),
+            threading.Thread(target=self._encode_loop, name="live-view-encoder", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        print(f"Live view on http://{self.host}:{self.port}/")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+
+    def publish(self, frame):
+        """Offers a display frame; it must not be modified afterwards (it may be encoded later)."""
+        if not self.clients:
+            return
+        now = time.perf_counter()
+        if now - self._last_publish < self.interval:
+            return
+        self._last_publish = now
+        with self._cond:
+            # An unencoded older frame is simply replaced
+            self._pending = frame
+            self._cond.notify_all()
+
+    def _encode_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self._running)
+                if not self._running:
+                    return
+                frame, self._pending = self._pending, None
+            ok, buffer = cv2.imencode('.jpg', frame, params)
+            if not ok:
+                continue
+            with self._cond:
+                self._jpeg = buffer.tobytes()
+                self._seq += 1
+                self.encoded += 1
+                self._cond.notify_all()
+
+    def _snapshot(self, timeout=2.0):
+        """Waits for a freshly encoded frame; None if none arrives within timeout."""
+        with self._cond:
+            # Counting as a client makes publish() hand over the next frame
+            self.clients += 1
+            seq = self._seq
+            try:
+                self._cond.wait_for(lambda: self._seq != seq or not self._running, timeout=timeout)
+                return self._jpeg if self._seq != seq else None
+            finally:
+                self.clients -= 1
+
+    def _stream(self, handler):
+        handler.send_response(200)
+        handler.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={_BOUNDARY.decode()}')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.end_headers()
+        with self._cond:
+            self.clients += 1
+        seq = 0
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != seq or not self._running, timeout=1.0)
+                    if not self._running:
+                        return
+                    if self._seq == seq:
+                        continue
+                    seq, jpeg = self._seq, self._jpeg
+                handler.wfile.write(b'--' + _BOUNDARY + b'\r\nContent-Type: image/jpeg\r\n'
+                                    + f'Content-Length: {len(jpeg)}\r\n\r\n'.encode())
+                handler.wfile.write(jpeg)
+                handler.wfile.write(b'\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._cond:
+                self.clients -= 1
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SEVERITIES = ('normal', 'warning', 'danger')
+
+
+class DetectionCounters:
+    """
+    Vehicle and violation counters, written only by the detection thread.
+
+    Each vehicle counts once in vehicles and once for every severity level it
+    reaches, so a car that goes from warning to danger shows up in both.
+    Plain attribute updates need no lock; readers may see a value one frame old.
+    """
+
+    def __init__(self):
+        self.vehicles = 0
+        self.by_severity = dict.fromkeys(SEVERITIES, 0)
+        self.last_speed_mph = 0.0
+        self._levels = {}
+
+    def observe(self, track_id, severity):
+        level = SEVERITIES.index(severity)
+        previous = self._levels.get(track_id)
+        if previous is None:
+            self.vehicles += 1
+        elif level <= previous:
+            return
+        self._levels[track_id] = level
+        self.by_severity[severity] += 1
+        if len(self._levels) > 512:
+            # Track ids only grow, so the oldest ids belong to long-gone vehicles
+            self._levels = {k: v for k, v in self._levels.items() if k > track_id - 256}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics(families):
+    """
+    Prometheus text exposition of families given as
+    (name, type, help, [(labels dict, value), ...]).
+    """
+    lines = []
+    for name, kind, help_text, samples in families:
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    Publishes metrics in Prometheus text format over HTTP (/metrics), to a
+    file for the node_exporter textfile collector, or both.
+
+    collect() is only called when a scrape arrives or the file is due, never
+    from the frame loop, so the loop pays nothing beyond its own counters.
+    """
+
+    def __init__(self, collect, port=None, host="0.0.0.0", path=None, interval=5.0):
+        self.collect = collect
+        self.port = port
+        self.host = host
+        self.path = path
+        self.interval = interval
+        self._server = None
+        self._threads = []
+        self._stop = threading.Event()
+
+    def render(self):
+        return render_metrics(self.collect())
+
+    def start(self):
+        self._stop.clear()
+        if self.port:
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if not self.path.startswith('/metrics'):
+                        self.send_error(404)
+                        return
+                    body = exporter.render().encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+            self._server.daemon_threads = True
+            self._threads.append(threading.Thread(target=self._server.serve_forever,
+                                                  name="metrics-http", daemon=True))
+        if self.path:
+            self._threads.append(threading.Thread(target=self._file_loop, name="metrics-file", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        if self.path:
+            self.write_file()
+
+    def write_file(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Rename into place so the collector never reads a half-written file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.path)
+
+    def _file_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write_file()
+
+
+class RateTracker:
+    """
+    Per-second rate of a counter, refreshed at most every min_interval so that
+    several scrapers reading in quick succession see a stable value.
+    """
+
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._last = None
+        self._rate = None
+
+    def rate(self, count):
+        now = time.perf_counter()
+        if self._last is None or count < self._last[1]:
+            self._last = (now, count)
+            return None
+        last_time, last_count = self._last
+        if now - last_time >= self.min_interval:
+            self._rate = round((count - last_count) / (now - last_time), 2)
+            self._last = (now, count)
+        return self._rate
@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap idle-scene detector run ahead of the full detection pipeline.
+
+    Each frame is shrunk to a small grayscale thumbnail and diffed against the
+    previous one; the full detector only needs to run when enough thumbnail
+    pixels changed. Once motion is seen the gate stays open for hold_frames so
+    a vehicle is not dropped between two quiet frames.
+    """
+
+    def __init__(self, thumb_width=80, pixel_threshold=12, min_changed_fraction=0.002,
+                 hold_frames=15, idle_bg_interval=10):
+        self.thumb_width = thumb_width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.hold_frames = max(1, int(hold_frames))
+        self.idle_bg_interval = max(1, int(idle_bg_interval))
+        self.frames = 0
+        self.skipped = 0
+        self._shape = None
+        self._hold = 0
+        self._idle_frames = 0
+
+    def reset(self):
+        self._shape = None
+        self._hold = 0
+        self._idle_frames = 0
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def _allocate(self, roi):
+        height, width = roi.shape[:2]
+        thumb_h = max(1, int(round(self.thumb_width * height / width)))
+        size = (thumb_h, self.thumb_width)
+        self._small = np.empty(size + roi.shape[2:], np.uint8)
+        self._thumbs = [np.empty(size, np.uint8), np.empty(size, np.uint8)]
+        self._diff = np.empty(size, np.uint8)
+        self._current = 0
+        self._min_changed = max(1, int(self.min_changed_fraction * thumb_h * self.thumb_width))
+        self._shape = roi.shape
+
+    def check(self, roi):
+        """Returns True when the full detector should run on this frame."""
+        self.frames += 1
+        first = self._shape != roi.shape
+        if first:
+            self._allocate(roi)
+
+        thumb = self._thumbs[self._current ^ 1]
+        if roi.ndim == 3:
+            cv2.resize(roi, (self.thumb_width, thumb.shape[0]), dst=self._small, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=thumb)
+        else:
+            cv2.resize(roi, (self.thumb_width, thumb.shape[0]), dst=thumb, interpolation=cv2.INTER_AREA)
+        prev = self._thumbs[self._current]
+        self._current ^= 1
+
+        if first:
+            self._hold = self.hold_frames
+        else:
+            cv2.absdiff(prev, thumb, dst=self._diff)
+            cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+            if cv2.countNonZero(self._diff) >= self._min_changed:
+                self._hold = self.hold_frames
+
+        if self._hold > 0:
+            self._hold -= 1
+            self._idle_frames = 0
+            return True
+        self.skipped += 1
+        self._idle_frames += 1
+        return False
+
+    def background_update_due(self):
+        """True on the idle frames where the background model should still learn."""
+        return self._idle_frames % self.idle_bg_interval == 0
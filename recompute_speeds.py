@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Re-derives vehicle speeds from saved trajectories under new calibration settings.
+
+Usage: python3 recompute_speeds.py [options] [Trajectories/ | file.npz ...]
+
+Trajectories are written by speed_detection.py when "save_trajectories" is
+enabled. No video is decoded: the tracker's speed filter is re-run over the
+stored observations, so a month of recordings re-scores in seconds. Options
+left out keep the values each file was recorded with.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from trajectories import load_trajectories, recompute_speeds
+
+
+def _trajectory_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.npz"))))
+        else:
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', default=["Trajectories"])
+    parser.add_argument('--calibration-factor', type=float)
+    parser.add_argument('--car-width', type=float, help="assumed vehicle width in meters")
+    parser.add_argument('--accel-std', type=float, help="Kalman acceleration noise (m/s^2)")
+    parser.add_argument('--measurement-std-px', type=float, help="Kalman centroid noise (px)")
+    parser.add_argument('--measurement-std-m', type=float, help="Kalman road-plane noise (m)")
+    parser.add_argument('--min-observations', type=int)
+    parser.add_argument('--min-speed', type=float, help="minimum reported speed (mph)")
+    parser.add_argument('--speed-limit', type=float, default=35.0)
+    parser.add_argument('--no-ground-plane', action='store_true',
+                        help="ignore saved homographies and use the width-based estimate")
+    parser.add_argument('--report', default=os.path.join("Results", "recomputed_speeds.json"))
+    args = parser.parse_args()
+
+    files = _trajectory_files(args.paths)
+    if not files:
+        raise SystemExit("No trajectory files found")
+
+    start_time = time.perf_counter()
+    data = load_trajectories(files)
+    loaded = time.perf_counter()
+    result = recompute_speeds(
+        data,
+        calibration_factor=args.calibration_factor,
+        car_width_m=args.car_width,
+        accel_std=args.accel_std,
+        measurement_std_px=args.measurement_std_px,
+        measurement_std_m=args.measurement_std_m,
+        min_observations=args.min_observations,
+        min_speed_threshold=args.min_speed,
+        use_ground_plane=not args.no_ground_plane
+    )
+    elapsed = time.perf_counter() - loaded
+
+    tracks = result['tracks']
+    measured = ~np.isnan(tracks['max_speed_mph'])
+    speeding = measured & (tracks['max_speed_mph'] > args.speed_limit)
+    print(f"{len(files)} files, {len(result['timestamp'])} observations, {len(tracks['track_id'])} tracks "
+          f"(loaded in {loaded - start_time:.2f}s, recomputed in {elapsed:.2f}s)")
+    print(f"{measured.sum()} tracks with a speed, {speeding.sum()} over {args.speed_limit:g} mph")
+
+    report = {
+        'parameters': {k: v for k, v in vars(args).items() if k not in ('paths', 'report')},
+        'tracks': [
+            {
+                'source': data['meta'][index]['source'],
+                'track_id': int(track_id),
+                'start_s': round(float(start), 3),
+                'observations': int(count),
+                'max_speed_mph': round(float(speed), 2)
+            }
+            for index, track_id, start, count, speed in zip(tracks['file'], tracks['track_id'], tracks['start_s'],
+                                                            tracks['observations'], tracks['max_speed_mph'])
+            if not np.isnan(speed)
+        ]
+    }
+    os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
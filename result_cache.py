@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+
+def file_fingerprint(path, samples=8, chunk_size=65536):
+    """
+    Fast content hash of a video: its size plus a few chunks spread evenly
+    through the file (always including the first and last), so multi-GB
+    recordings are identified without reading them in full.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        if size <= samples * chunk_size:
+            digest.update(f.read())
+        else:
+            span = size - chunk_size
+            for i in range(samples):
+                f.seek(span * i // (samples - 1))
+                digest.update(f.read(chunk_size))
+    return digest.hexdigest()
+
+
+def config_fingerprint(params):
+    """Hash of a JSON-serialisable parameter set; key order does not matter."""
+    encoded = json.dumps(params, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of video analysis results keyed by (file hash, config hash).
+
+    Any change to the video or to a parameter that affects detection produces
+    a new key, so stale entries are never returned; they simply stop being
+    used and are evicted least-recently-used first once the cache exceeds
+    max_entries or max_bytes. Entries are JSON files whose modification time
+    is refreshed on every hit.
+    """
+
+    def __init__(self, directory, max_entries=200, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(file_hash, config_hash):
+        return f"{file_hash}-{config_hash}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                results = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return results
+
+    def put(self, key, results):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        # Write then rename so a concurrent reader never sees a partial entry
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(results, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for _, size, path in entries:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Already evicted by another worker sharing the directory
+                pass
+            count -= 1
+            total -= size
@@ -0,0 +1,97 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Header layout: one int64 write counter followed by per-slot sequence numbers and timestamps
+_COUNTER_BYTES = 8
+
+
+class SharedFrameRing:
+    """
+    Ring of preallocated frame slots in shared memory, exposed as NumPy views.
+
+    A writer fills the next slot in place and publishes it with commit();
+    other processes then refer to the frame by (slot, seq) instead of pickling
+    pixels through a queue. Every slot carries the sequence number and capture
+    timestamp of the frame it holds. While a slot is being rewritten its
+    sequence number is -1, so a reader can detect that a frame was overwritten
+    or torn by checking is_current() after using it.
+    """
+
+    def __init__(self, shape, dtype=np.uint8, slots=8, name=None, create=True):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        header_bytes = _COUNTER_BYTES + slots * 16
+        # Keep frames 64-byte aligned for SIMD-friendly access
+        self._frames_offset = (header_bytes + 63) // 64 * 64
+        size = self._frames_offset + slots * frame_bytes
+
+        self._owner = create
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        buf = self._shm.buf
+        self._counter = np.ndarray((1,), np.int64, buffer=buf, offset=0)
+        self.seq = np.ndarray((slots,), np.int64, buffer=buf, offset=_COUNTER_BYTES)
+        self.timestamps = np.ndarray((slots,), np.float64, buffer=buf, offset=_COUNTER_BYTES + slots * 8)
+        self.frames = np.ndarray((slots,) + self.shape, self.dtype, buffer=buf, offset=self._frames_offset)
+        if create:
+            self._counter[0] = 0
+            self.seq[:] = -1
+            self.timestamps[:] = 0.0
+
+    def spec(self):
+        """Arguments for attach() in another process."""
+        return {'name': self._shm.name, 'shape': self.shape, 'dtype': self.dtype.str, 'slots': self.slots}
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(spec['shape'], spec['dtype'], spec['slots'], name=spec['name'], create=False)
+
+    @property
+    def written(self):
+        """Number of frames committed so far."""
+        return int(self._counter[0])
+
+    def begin_write(self):
+        """Claims the next slot for writing and returns (slot, view) to fill in place."""
+        slot = self.written % self.slots
+        self.seq[slot] = -1
+        return slot, self.frames[slot]
+
+    def commit(self, slot, timestamp):
+        """Publishes the slot just filled and returns its sequence number."""
+        seq = self.written
+        self.timestamps[slot] = timestamp
+        self.seq[slot] = seq
+        self._counter[0] = seq + 1
+        return seq
+
+    def write(self, frame, timestamp):
+        """Copies frame into the next slot and publishes it; returns (slot, seq)."""
+        slot, view = self.begin_write()
+        np.copyto(view, frame)
+        return slot, self.commit(slot, timestamp)
+
+    def view(self, slot):
+        return self.frames[slot]
+
+    def is_current(self, slot, seq):
+        """True while the slot still holds frame seq (it has not been overwritten)."""
+        return int(self.seq[slot]) == seq
+
+    def latest(self):
+        """Returns (slot, seq, timestamp) of the newest committed frame, or None."""
+        written = self.written
+        if not written:
+            return None
+        seq = written - 1
+        slot = seq % self.slots
+        return slot, seq, float(self.timestamps[slot])
+
+    def close(self):
+        # Drop the views before releasing the mapping
+        self._counter = self.seq = self.timestamps = self.frames = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
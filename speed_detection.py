@@ -7,9 +7,146 @@ import os
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
-from multiprocessing import Process, Value, Lock, Array
-from picamera2 import Picamera2
-from libcamera import Transform
+from statistics import NormalDist
+from multiprocessing import Process, Value, Lock, Array, Pool, Queue
+from threading import Thread
+from queue import Empty
+try:
+    from picamera2 import Picamera2
+    from libcamera import Transform
+except ImportError:
+    # Recorded videos can still be analysed on machines without the Pi camera stack
+    Picamera2 = None
+from frame_pipeline import DropOldestQueue, PipelineStats
+from vehicle_tracker import VehicleTracker
+from stage_profiler import StageProfiler
+from violation_recorder import ViolationRecorder
+from shared_frames import SharedFrameRing
+from detection_buffers import BufferPool
+from motion_gate import MotionGate
+from ground_calibration import GroundPlaneCalibration
+from trajectories import TrajectoryLog
+from background_models import create_background_model, background_params
+from alert_dispatcher import AlertDispatcher
+from live_view import LiveViewServer
+from metrics import DetectionCounters, MetricsExporter, RateTracker
+from result_cache import ResultCache, file_fingerprint, config_fingerprint
+
+DEFAULT_CONFIG = {
+    "px_per_meter": 85,
+    "frame_width": 1280,
+    "frame_height": 720,
+    "speed_limit_mph": 35.0,
+    "calibration_factor": 1.0,
+    "distance_compensation": 1.18,
+    "min_speed_threshold": 10.0,
+    # Homography calibration cache (created with the calibration mode)
+    "ground_calibration": "ground_calibration.npz",
+    # Background model engine: mog2, knn, running_average or median. Per-engine
+    # parameter overrides, e.g. {"knn": {"dist2Threshold": 600}}; defaults in
+    # background_models.DEFAULT_PARAMS
+    "background_model": "mog2",
+    "background_params": {},
+    # Downscale factor for motion analysis (1.0 = full resolution, 0.5, 0.25, ...)
+    "analysis_scale": 1.0,
+    # Multi-vehicle tracking (distances in full-resolution pixels)
+    "tracker_max_distance_px": 150,
+    "tracker_max_missed": 5,
+    # Kalman speed filter: expected acceleration (m/s^2), centroid noise (px),
+    # observations required before a speed is reported, confidence interval level
+    "kalman_accel_std": 3.0,
+    "kalman_measurement_std_px": 4.0,
+    "kalman_min_observations": 5,
+    # Position noise (m) used instead when a ground-plane calibration is loaded
+    "kalman_measurement_std_m": 0.15,
+    "speed_confidence": 0.95,
+    # Idle-scene gating: thumbnail width, per-pixel change threshold, fraction of
+    # changed pixels that opens the gate, frames it stays open, idle background cadence
+    "motion_gate": False,
+    "gate_thumbnail_width": 80,
+    "gate_pixel_threshold": 12,
+    "gate_min_changed_fraction": 0.002,
+    "gate_hold_frames": 15,
+    "gate_idle_bg_interval": 10,
+    # Per-stage latency profiling (toggle at runtime with 'p')
+    "profiling": False,
+    "profile_window": 600,
+    "profile_dump_interval_s": 10.0,
+    "profile_log": "Results/profile.jsonl",
+    # Violation clips: frames kept before/after a danger-level speed, ring buffer cap
+    "record_violations": False,
+    "violation_dir": "Violations",
+    "violation_pre_s": 5.0,
+    "violation_post_s": 5.0,
+    "violation_buffer_mb": 64,
+    "violation_jpeg_quality": 85,
+    # Raw per-track observations for offline re-calibration (recompute_speeds.py)
+    "save_trajectories": False,
+    "trajectory_dir": "Trajectories",
+    # Annotated output as MJPEG over HTTP (http://<host>:<port>/); with
+    # show_window off no X display is needed
+    "show_window": True,
+    "live_view": False,
+    "live_view_host": "0.0.0.0",
+    "live_view_port": 8080,
+    "live_view_fps": 10.0,
+    "live_view_quality": 70,
+    # Prometheus metrics: HTTP endpoint (/metrics on metrics_port) and/or a
+    # textfile-collector file (e.g. /var/lib/node_exporter/speed_camera.prom)
+    "metrics_port": None,
+    "metrics_host": "0.0.0.0",
+    "metrics_file": None,
+    "metrics_interval_s": 5.0,
+    # Speeding events POSTed to a collector during live detection (None = off)
+    "alert_url": None,
+    "alert_queue_size": 256,
+    "alert_batch_size": 20,
+    "alert_batch_wait_s": 0.5,
+    "alert_timeout_s": 2.0,
+    "alert_backoff_s": 1.0,
+    "alert_backoff_max_s": 60.0,
+    "alert_spool": "Results/alert_spool.jsonl",
+    # Headless video analysis output
+    "results_dir": "Results",
+    # Reuse results for videos already analysed with the same detection settings
+    "result_cache": True,
+    "result_cache_dir": "Results/cache",
+    "result_cache_max_entries": 200,
+    "result_cache_max_mb": 256,
+    "batch_processes": None,
+    "segment_warmup_s": 10.0,
+    # Live capture pipeline (capture / detection / render on separate threads)
+    "live_pipeline": False,
+    "pipeline_queue_size": 2,
+    "pipeline_late_ms": 100,
+    # Capture YUV420 and detect on the Y plane; colour conversion only happens
+    # for frames that are displayed, streamed or recorded
+    "luma_detection": False,
+    # Detect on the Picamera2 lores stream (YUV420, this wide, same aspect as
+    # main); the full-resolution main stream is fetched only when needed
+    "dual_stream": False,
+    "lores_width": 320,
+    # Run capture in its own process, passing frames through a shared-memory ring
+    "pipeline_capture_process": False,
+    "shared_ring_slots": 8
+}
+
+# Empty blob set fed to the tracker on frames the motion gate skips
+_NO_BOXES = np.empty((0, 4), np.int32)
+_NO_CENTROIDS = np.empty((0, 2), np.float64)
+_NO_PX_PER_METER = np.empty(0, np.float64)
+
+# Config keys read by detection and tracking on a video. Only these (plus the
+# derived settings in _detection_params) key the result cache, so outputs,
+# services and display settings do not invalidate it
+_DETECTION_CONFIG_KEYS = (
+    'frame_width', 'frame_height', 'calibration_factor', 'min_speed_threshold',
+    'tracker_max_distance_px', 'tracker_max_missed',
+    'kalman_accel_std', 'kalman_measurement_std_px', 'kalman_min_observations',
+    'kalman_measurement_std_m', 'speed_confidence',
+    'motion_gate', 'gate_thumbnail_width', 'gate_pixel_threshold',
+    'gate_min_changed_fraction', 'gate_hold_frames', 'gate_idle_bg_interval'
+)
 
 class SpeedCameraUI:
     def __init__(self, master):
@@ -88,37 +225,88 @@ class SpeedOverlay:
             'danger_color': (0, 0, 255),
             'font_scale': 0.8,
             'thickness': 2,
-            'position': (20, 50)
+            'position': (20, 50),
+            'panel_size': (300, 110),
+            'clock_decimals': 1
         }
+        # Pre-rendered panel background and text layers, rebuilt only when
+        # their size or contents change
+        self._panel_bg = None
+        self._layers = {}
 
-    def get_speed_color(self, speed, speed_limit, warn_thresh, danger_thresh):
+    def get_speed_severity(self, speed, speed_limit, warn_thresh, danger_thresh):
         if speed >= speed_limit + danger_thresh:
-            return self.settings['danger_color']
+            return 'danger'
         elif speed >= speed_limit + warn_thresh:
-            return self.settings['warning_color']
-        return self.settings['normal_color']
+            return 'warning'
+        return 'normal'
+
+    def get_speed_color(self, speed, speed_limit, warn_thresh, danger_thresh):
+        severity = self.get_speed_severity(speed, speed_limit, warn_thresh, danger_thresh)
+        return self.settings[f'{severity}_color']
+
+    def _panel_background(self, shape):
+        if self._panel_bg is None or self._panel_bg.shape != shape:
+            self._panel_bg = np.empty(shape, np.uint8)
+            self._panel_bg[:] = self.settings['bg_color']
+        return self._panel_bg
+
+    def _text_layer(self, name, key, height, lines):
+        """
+        Returns (image, mask) with lines of (text, origin, scale, color, thickness)
+        rendered once per distinct key. The layer is as wide as the longest line,
+        which may run past the panel as putText on the frame would.
+        """
+        cached = self._layers.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+        width = max(origin[0] + cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)[0][0] + thickness
+                    for text, origin, scale, color, thickness in lines)
+        image = np.zeros((height, width, 3), np.uint8)
+        for text, origin, scale, color, thickness in lines:
+            cv2.putText(image, text, origin, cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        mask = image.any(axis=2)[:, :, None]
+        self._layers[name] = (key, image, mask)
+        return image, mask
+
+    def _blit(self, frame, layer):
+        image, mask = layer
+        h = min(frame.shape[0], image.shape[0])
+        w = min(frame.shape[1], image.shape[1])
+        np.copyto(frame[:h, :w], image[:h, :w], where=mask[:h, :w])
+
+    def _clock_text(self):
+        decimals = self.settings['clock_decimals']
+        now = time.time()
+        tick = int(now * 10 ** decimals)
+        cached = self._layers.get('clock')
+        if cached is not None and cached[0] == tick:
+            return tick, None
+        text = datetime.fromtimestamp(now).strftime("%Y-%m-%d %H:%M:%S.%f")
+        return tick, text[:len(text) - 6 + decimals] if decimals else text[:-7]
 
     def draw_overlay(self, frame, speed_data, warn_thresh, danger_thresh):
-        height, width = frame.shape[:2]
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (300, 110), self.settings['bg_color'], -1)
-        cv2.addWeighted(overlay, self.settings['bg_alpha'], frame, 
-                      1 - self.settings['bg_alpha'], 0, frame)
+        # Only the panel region is blended; the rest of the frame is untouched
+        panel_w, panel_h = self.settings['panel_size']
+        panel = frame[:panel_h, :panel_w]
+        alpha = self.settings['bg_alpha']
+        cv2.addWeighted(self._panel_background(panel.shape), alpha, panel, 1 - alpha, 0, dst=panel)
         
-        timestamp_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        cv2.putText(frame, timestamp_str, (10, 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        tick, timestamp_str = self._clock_text()
+        self._blit(frame, self._text_layer('clock', tick, 28, [
+            (timestamp_str, (10, 20), 0.5, (255, 255, 255), 1)
+        ]))
         
         if speed_data:
             speed_text = f"Speed: {speed_data['speed_mph']:.1f} MPH"
+            if 'speed_ci_mph' in speed_data:
+                speed_text += f" +/-{speed_data['speed_ci_mph']:.1f}"
             color = self.get_speed_color(
                 speed_data['speed_mph'], 
                 speed_data['speed_limit'],
                 warn_thresh,
                 danger_thresh
             )
-            cv2.putText(frame, speed_text, self.settings['position'], 
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
             
             if speed_data['speed_mph'] > speed_data['speed_limit'] + danger_thresh:
                 status = "DANGER"
@@ -128,8 +316,10 @@ class SpeedOverlay:
                 status = "NORMAL"
                 
             status_pos = (self.settings['position'][0], self.settings['position'][1] + 40)
-            cv2.putText(frame, status, status_pos,
-                       cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+            self._blit(frame, self._text_layer('speed', (speed_text, status, color), panel_h, [
+                (speed_text, self.settings['position'], 1, color, 2),
+                (status, status_pos, 1, color, 2)
+            ]))
         
         return frame
 
@@ -140,13 +330,12 @@ class SpeedCameraSystem:
         self.current_speed = Value('d', 0.0)
         self.lock = Lock()
         self.prev_frame = None
-        self.last_detection_time = None
-        self.last_speed = 0.0
+        # Capture time (s) of the latest analysed frame: sensor timestamp or container PTS
+        self.stream_time = 0.0
         
         # Calibration data (2022.5 px/m at 0.6096 m / 2 ft)
         self.calibration_distance = 0.6096  # 2 ft in meters
         self.calibration_px_per_m = 2022.5  # Your measured px/m at 2 ft
-        self.px_per_meter = self.calibration_px_per_m  # Initialize with baseline
         
         # Real-world car dimensions (avg width: ~1.8m, height: ~1.5m)
         self.car_width_m = 1.8
@@ -158,188 +347,1092 @@ class SpeedCameraSystem:
         # Detection parameters
         self.min_contour_area = 1200
         self.max_contour_area = 8000
-        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
-            history=300,
-            varThreshold=24,
-            detectShadows=False
+        self.background_model = self.config['background_model']
+        self.background_params = background_params(
+            self.background_model, self.config['background_params'].get(self.background_model))
+        self.diff_threshold = 30
+        # Motion analysis runs on the zone downscaled by this factor; results are
+        # mapped back to full-resolution coordinates
+        self.analysis_scale = float(self.config['analysis_scale'])
+        self.luma = self.config['luma_detection']
+        self.dual_stream = self.config['dual_stream']
+        self.lores_size = _lores_size(self.config)
+        if self.dual_stream:
+            # Lores frames arrive already at analysis scale; recorded videos are
+            # analysed at the same scale so they reproduce live detections
+            self.analysis_scale = self.lores_size[0] / self.config['frame_width']
+        # Detection reads the camera buffer in place and colour is produced on demand
+        self.deferred_color = self.luma or self.dual_stream
+        self.bg_subtractor = self._create_bg_subtractor()
+        self.morph_kernel = np.ones((3,3), np.uint8)
+        self.buffer_pool = BufferPool()
+        self.motion_gate = None
+        if self.config['motion_gate']:
+            self.motion_gate = MotionGate(
+                thumb_width=self.config['gate_thumbnail_width'],
+                pixel_threshold=self.config['gate_pixel_threshold'],
+                min_changed_fraction=self.config['gate_min_changed_fraction'],
+                hold_frames=self.config['gate_hold_frames'],
+                idle_bg_interval=self.config['gate_idle_bg_interval']
+            )
+        self.ground_calibration = self._load_ground_calibration()
+        self.tracker = VehicleTracker(
+            max_distance=self.config['tracker_max_distance_px'],
+            max_missed=self.config['tracker_max_missed'],
+            default_px_per_meter=self.calibration_px_per_m,  # Initialize with baseline
+            filter_params=self._filter_params()
         )
+        self.min_observations = self.config['kalman_min_observations']
+        self.trajectories = TrajectoryLog() if self.config['save_trajectories'] else None
+        self.result_cache = None
+        if self.config['result_cache']:
+            self.result_cache = ResultCache(
+                self.config['result_cache_dir'],
+                max_entries=self.config['result_cache_max_entries'],
+                max_bytes=self.config['result_cache_max_mb'] * 1024 * 1024
+            )
+        self.confidence_z = NormalDist().inv_cdf(0.5 + self.config['speed_confidence'] / 2)
         
         # UI Settings
         self.speed_limit = 35.0
         self.warn_thresh = 5.0
         self.danger_thresh = 10.0
         
+        self.profiler = StageProfiler(
+            enabled=self.config['profiling'],
+            window=self.config['profile_window'],
+            dump_interval=self.config['profile_dump_interval_s'],
+            dump_path=self.config['profile_log']
+        )
+        
+        self.detection_counters = DetectionCounters()
+        self.pipeline_stats = None
+        self._queues = {}
+        self._capture_rate = RateTracker()
+        self._processing_rate = RateTracker()
+        self.metrics = None
+        if self.config['metrics_port'] or self.config['metrics_file']:
+            self.metrics = MetricsExporter(
+                self._collect_metrics,
+                port=self.config['metrics_port'],
+                host=self.config['metrics_host'],
+                path=self.config['metrics_file'],
+                interval=self.config['metrics_interval_s']
+            )
+            if not self.profiler.enabled:
+                # Stage latencies come from the profiler's rolling window; sample without console dumps
+                self.profiler.enabled = True
+                self.profiler.dump_interval = 0
+        
+        self.recorder = None
+        if self.config['record_violations']:
+            self.recorder = ViolationRecorder(
+                self.config['violation_dir'],
+                pre_seconds=self.config['violation_pre_s'],
+                post_seconds=self.config['violation_post_s'],
+                max_buffer_mb=self.config['violation_buffer_mb'],
+                jpeg_quality=self.config['violation_jpeg_quality']
+            )
+        
+        self.alerts = None
+        if self.config['alert_url']:
+            self.alerts = AlertDispatcher(
+                self.config['alert_url'],
+                queue_size=self.config['alert_queue_size'],
+                batch_size=self.config['alert_batch_size'],
+                batch_wait=self.config['alert_batch_wait_s'],
+                timeout=self.config['alert_timeout_s'],
+                backoff=self.config['alert_backoff_s'],
+                backoff_max=self.config['alert_backoff_max_s'],
+                spool_path=self.config['alert_spool']
+            )
+        # track_id -> severity already reported, so each vehicle alerts once per level
+        self._alerted = {}
+        
         # Display settings
         self.window_name = "Speed Camera System"
+        self.show_window = self.config['show_window']
+        self.live_view = None
+        if self.config['live_view']:
+            self.live_view = LiveViewServer(
+                host=self.config['live_view_host'],
+                port=self.config['live_view_port'],
+                fps=self.config['live_view_fps'],
+                quality=self.config['live_view_quality']
+            )
         self.border_color = (0, 255, 0)
         self.border_thickness = int(min(self.config['frame_width'], self.config['frame_height']) * 0.02)
+        self._border_shape = None
+        self._border_px = 0
+
+    def _create_bg_subtractor(self):
+        return create_background_model(self.background_model, self.background_params)
+
+    def reset_detection_state(self):
+        """Forgets the background model and tracking history, e.g. before starting a new video."""
+        self.prev_frame = None
+        self.stream_time = 0.0
+        self.tracker.reset()
+        if self.trajectories is not None:
+            # Track ids restart, so unsaved observations cannot be kept apart
+            self.trajectories.clear()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self.bg_subtractor = self._create_bg_subtractor()
+
+    def _load_ground_calibration(self):
+        path = self.config['ground_calibration']
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            calibration = GroundPlaneCalibration.load(
+                path, (self.config['frame_width'], self.config['frame_height']))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Warning: could not load ground calibration '{path}': {e}")
+            return None
+        return calibration
+
+    def _filter_params(self):
+        # With a ground-plane calibration the filter runs in road meters
+        if self.ground_calibration is not None:
+            measurement_std = self.config['kalman_measurement_std_m']
+        else:
+            measurement_std = self.config['kalman_measurement_std_px']
+        return {'accel_std': self.config['kalman_accel_std'], 'measurement_std': measurement_std}
 
     def _load_config(self):
+        config = dict(DEFAULT_CONFIG)
         try:
             with open('config.json') as f:
-                return json.load(f)
+                config.update(json.load(f))
         except FileNotFoundError:
-            return {
-                "px_per_meter": 85,
-                "frame_width": 1280,
-                "frame_height": 720,
-                "speed_limit_mph": 35.0,
-                "calibration_factor": 1.0,
-                "distance_compensation": 1.18,
-                "min_speed_threshold": 10.0
-            }
-
-    def _estimate_distance(self, pixel_width):
+            pass
+        return config
+
+    def _blob_px_per_meter(self, widths):
         """
-        Estimates distance to object using pixel width and known real-world size.
-        Returns distance in meters.
+        Distance-adjusted px/m for each blob width, NaN where the implied
+        distance is unrealistic so the track keeps its previous estimate.
+        """
+        widths = np.asarray(widths, dtype=np.float64)
+        with np.errstate(divide='ignore'):
+            distances = (self.calibration_distance * self.calibration_px_per_m) / (widths / self.car_width_m)
+        px_per_meter = self.calibration_px_per_m * (self.calibration_distance / distances)
+        px_per_meter[~(distances < 50)] = np.nan  # Ignore unrealistic distances
+        return px_per_meter
+
+    def _blur_kernel_size(self):
+        # Keep the 15x15 blur's footprint relative to the vehicle when downscaled
+        size = max(3, int(round(15 * self.analysis_scale)))
+        return size if size % 2 else size + 1
+
+    def _extract_blobs(self, thresh, labels=None):
+        """
+        Labels the motion mask in one pass and returns (boxes, areas, centroids)
+        for every blob within the area limits, as NumPy arrays in full-resolution
+        zone coordinates. boxes is Nx4 (x, y, w, h), centroids is Nx2.
+        """
+        _, _, stats, centroids = cv2.connectedComponentsWithStats(thresh, labels=labels, connectivity=8)
+        # Row 0 is the background label
+        stats = stats[1:]
+        centroids = centroids[1:]
+
+        scale = self.analysis_scale
+        areas = stats[:, cv2.CC_STAT_AREA] / (scale * scale)
+        keep = (areas > self.min_contour_area) & (areas < self.max_contour_area)
+
+        boxes = stats[keep, :4]
+        if scale != 1.0:
+            boxes = np.rint(boxes / scale).astype(np.int32)
+        return boxes, areas[keep], centroids[keep] / scale
+
+    def _idle_frame(self, roi, prescaled=False):
+        """
+        Bookkeeping for a frame the motion gate skipped: tracks age out, the
+        background model keeps learning at a reduced cadence, and differencing
+        restarts from the next active frame.
+        """
+        self.tracker.update(self.stream_time, _NO_BOXES, _NO_CENTROIDS, _NO_PX_PER_METER)
+        self.prev_frame = None
+        if not self.motion_gate.background_update_due():
+            return
+        roi, buf = self._analysis_input(roi, prescaled)
+        self.bg_subtractor.apply(roi, buf.fg_mask)
+
+    def _analysis_input(self, roi, prescaled=False):
+        """
+        Returns the zone at analysis scale (resized into the pool when scaled)
+        together with the buffers sized for it. A prescaled zone is used as is.
+        """
+        scale = 1.0 if prescaled else self.analysis_scale
+        height, width = roi.shape[:2]
+        if scale != 1.0:
+            height, width = max(1, int(round(height * scale))), max(1, int(round(width * scale)))
+        channels = roi.shape[2] if roi.ndim == 3 else 1
+        # Every intermediate image of the detector is written into these reused buffers
+        buf = self.buffer_pool.get(height, width, channels)
+        if scale != 1.0:
+            roi = cv2.resize(roi, (width, height), dst=buf.small, interpolation=cv2.INTER_AREA)
+        return roi, buf
+
+    def _process_frame(self, frame, frame_time=None, timestamp=None, prescaled=False):
+        """
+        Runs detection and tracking on one frame. timestamp is the frame's
+        capture time in seconds (sensor timestamp or container PTS) and drives
+        all speed math; without it the clock advances by frame_time.
+        A prescaled frame (the lores stream) is already at analysis scale; the
+        detection zone is mapped onto it and results come back in full-resolution
+        coordinates as usual.
         """
-        if pixel_width == 0:
-            return float('inf')
-        # Inverse scaling: distance = (calib_distance * calib_px_per_m) / observed_px_per_m
-        observed_px_per_m = pixel_width / self.car_width_m
-        distance_m = (self.calibration_distance * self.calibration_px_per_m) / observed_px_per_m
-        return distance_m
-
-    def _process_frame(self, frame, frame_time):
         # Exact same tracking as your reference program
+        prof = self.profiler
+        t = prof.start()
+        if timestamp is not None:
+            self.stream_time = timestamp
+        else:
+            self.stream_time += frame_time
         x1, y1, x2, y2 = self.detection_zone
-        roi = frame[y1:y2, x1:x2]
+        if prescaled:
+            s = self.analysis_scale
+            roi = frame[int(round(y1 * s)):int(round(y2 * s)), int(round(x1 * s)):int(round(x2 * s))]
+        else:
+            roi = frame[y1:y2, x1:x2]
+        
+        if self.motion_gate is not None:
+            if not self.motion_gate.check(roi):
+                self._idle_frame(roi, prescaled)
+                prof.lap('gate', t)
+                return None
+            t = prof.lap('gate', t)
+        
+        roi, buf = self._analysis_input(roi, prescaled)
+        t = prof.lap('resize', t)
         
         # Background subtraction
-        fg_mask = self.bg_subtractor.apply(roi)
-        fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, np.ones((3,3), np.uint8))
+        self.bg_subtractor.apply(roi, buf.fg_mask)
+        t = prof.lap('bg_subtract', t)
+        cv2.morphologyEx(buf.fg_mask, cv2.MORPH_OPEN, self.morph_kernel, dst=buf.opened)
+        t = prof.lap('morphology', t)
         
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (15, 15), 0)
+        if roi.ndim == 2:
+            # Luma input is already the gray image
+            luma = roi
+        else:
+            luma = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY, dst=buf.gray)
+        t = prof.lap('grayscale', t)
+        ksize = self._blur_kernel_size()
+        gray = buf.next_blurred()
+        cv2.GaussianBlur(luma, (ksize, ksize), 0, dst=gray)
+        t = prof.lap('blur', t)
         
-        if self.prev_frame is None:
+        # The pool reallocates when the zone or scale changes; start differencing afresh then
+        if self.prev_frame is None or self.prev_frame.shape != gray.shape:
             self.prev_frame = gray
             return None
             
         # Motion detection
-        frame_diff = cv2.absdiff(self.prev_frame, gray)
-        frame_diff = cv2.bitwise_and(frame_diff, frame_diff, mask=fg_mask)
+        cv2.absdiff(self.prev_frame, gray, dst=buf.diff)
+        t = prof.lap('frame_diff', t)
         
-        _, thresh = cv2.threshold(frame_diff, 30, 255, cv2.THRESH_BINARY)
-        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # Thresholding before masking with the binary foreground mask gives the
+        # same result as masking first, without needing a zeroed output buffer
+        cv2.threshold(buf.diff, self.diff_threshold, 255, cv2.THRESH_BINARY, dst=buf.thresh)
+        cv2.bitwise_and(buf.thresh, buf.opened, dst=buf.thresh)
+        t = prof.lap('threshold', t)
+        boxes, areas, centroids = self._extract_blobs(buf.thresh, buf.labels)
+        t = prof.lap('blobs', t)
+        self.prev_frame = gray
         
-        valid_contours = [
-            c for c in contours 
-            if self.min_contour_area < cv2.contourArea(c) < self.max_contour_area
-        ]
+        if self.ground_calibration is not None:
+            # Bottom-centre of each box is where the vehicle meets the road
+            contacts = np.column_stack((x1 + boxes[:, 0] + boxes[:, 2] / 2.0, y1 + boxes[:, 1] + boxes[:, 3]))
+            tracks = self.tracker.update(self.stream_time, boxes, centroids, np.ones(len(boxes)),
+                                         self.ground_calibration.to_world(contacts))
+        else:
+            tracks = self.tracker.update(self.stream_time, boxes, centroids, self._blob_px_per_meter(boxes[:, 2]))
+        if self.trajectories is not None:
+            self.trajectories.append(self.stream_time, tracks, self.detection_zone)
         
-        if valid_contours:
-            contour = max(valid_contours, key=cv2.contourArea)
-            x, y, w, h = cv2.boundingRect(contour)
-            
-            # Estimate distance and adjust px_per_meter dynamically
-            distance = self._estimate_distance(w)
-            if distance < 50:  # Ignore unrealistic distances
-                self.px_per_meter = self.calibration_px_per_m * (self.calibration_distance / distance)
-            
-            if self.last_detection_time is not None:
-                speed_mph = self._calculate_speed(y, y+h, frame_time)
-                if speed_mph > self.config.get('min_speed_threshold', 10.0):
-                    self.last_detection_time = time.time()
-                    return {
-                        'speed_mph': speed_mph * self.config['calibration_factor'],
-                        'speed_kmh': speed_mph * 1.60934,
-                        'bounding_box': (x1+x, y1+y, w, h),
-                        'speed_limit': self.speed_limit
-                    }
-            self.last_detection_time = time.time()
+        vehicles = []
+        for track in tracks:
+            if track.hits < self.min_observations:
+                continue
+            speed_mps, speed_std = track.speed()
+            speed_mph = speed_mps * 2.23694  # Convert m/s to mph
+            if speed_mph <= self.config['min_speed_threshold']:
+                continue
+            speed_mph *= self.config['calibration_factor']
+            x, y, w, h = track.box
+            vehicles.append({
+                'track_id': track.track_id,
+                'speed_mph': speed_mph,
+                'speed_kmh': speed_mph * 1.60934,
+                # Half-width of the confidence interval around speed_mph
+                'speed_ci_mph': self.confidence_z * speed_std * 2.23694 * self.config['calibration_factor'],
+                'bounding_box': (x1+x, y1+y, w, h),
+                'speed_limit': self.speed_limit
+            })
         
-        self.prev_frame = gray
-        return None
+        prof.lap('tracking', t)
+        if not vehicles:
+            return None
+        # Top-level fields describe the fastest vehicle for the overlay
+        speed_data = dict(max(vehicles, key=lambda v: v['speed_mph']))
+        speed_data['vehicles'] = vehicles
+        self._count_detections(speed_data)
+        return speed_data
 
-    def _calculate_speed(self, entry_y, exit_y, frame_time):
-        # Same calculation as your reference
-        pixels = abs(exit_y - entry_y)
-        meters = pixels / self.px_per_meter  # Now uses distance-adjusted px_per_meter
-        speed_mph = (meters / frame_time) * 2.23694  # Convert m/s to mph
-        
-        # Smoothing filter
-        if hasattr(self, 'last_speed'):
-            speed_mph = 0.7 * speed_mph + 0.3 * self.last_speed
-        self.last_speed = speed_mph
-        
-        return speed_mph
+    def _count_detections(self, speed_data):
+        counters = self.detection_counters
+        for vehicle in speed_data['vehicles']:
+            counters.observe(vehicle['track_id'], self.overlay.get_speed_severity(
+                vehicle['speed_mph'], vehicle['speed_limit'], self.warn_thresh, self.danger_thresh))
+        counters.last_speed_mph = speed_data['speed_mph']
+        self.current_speed.value = speed_data['speed_mph']
+
+    def _collect_metrics(self):
+        """Metric families for MetricsExporter; runs on the exporter's threads, reading without locks."""
+        families = []
+        stats = self.pipeline_stats
+        if stats is not None:
+            families += [
+                ('speed_camera_capture_fps', 'gauge', "Frames captured per second",
+                 [({}, self._capture_rate.rate(stats.captured))]),
+                ('speed_camera_processing_fps', 'gauge', "Frames run through detection per second",
+                 [({}, self._processing_rate.rate(stats.processed))]),
+                ('speed_camera_frames_captured_total', 'counter', "Frames captured",
+                 [({}, stats.captured)]),
+                ('speed_camera_frames_processed_total', 'counter', "Frames run through detection",
+                 [({}, stats.processed)]),
+                ('speed_camera_frames_dropped_total', 'counter',
+                 "Frames dropped before detection or render, or torn in the shared ring",
+                 [({'stage': 'detection'}, stats.dropped_before_detection),
+                  ({'stage': 'render'}, stats.dropped_before_render),
+                  ({'stage': 'torn'}, stats.torn)]),
+                ('speed_camera_frames_late_total', 'counter', "Frames rendered later than pipeline_late_ms",
+                 [({}, stats.late)])
+            ]
+
+        depths = [({'queue': name}, q.qsize()) for name, q in list(self._queues.items())]
+        if self.alerts is not None:
+            depths.append(({'queue': 'alerts'}, self.alerts.queue_depth))
+            families.append(('speed_camera_alerts_spooled', 'gauge', "Alert events waiting in the on-disk spool",
+                             [({}, self.alerts.spooled)]))
+            families.append(('speed_camera_alerts_dropped_total', 'counter',
+                             "Alert events dropped while the dispatcher could not keep up",
+                             [({}, self.alerts.dropped)]))
+        families.append(('speed_camera_queue_depth', 'gauge', "Items waiting in each queue", depths))
+
+        stages = self.profiler.snapshot()['stages'] if self.profiler.enabled else {}
+        families.append(('speed_camera_stage_latency_seconds', 'gauge',
+                         "Per-stage latency quantiles over the profiler window",
+                         [({'stage': stage, 'quantile': q}, round(s[key] / 1000.0, 6))
+                          for stage, s in stages.items()
+                          for q, key in (('0.5', 'p50_ms'), ('0.95', 'p95_ms'), ('0.99', 'p99_ms'))]))
+
+        counters = self.detection_counters
+        families += [
+            ('speed_camera_vehicles_total', 'counter', "Vehicles with a measured speed",
+             [({}, counters.vehicles)]),
+            ('speed_camera_violations_total', 'counter', "Vehicles reaching each speed severity level",
+             [({'severity': severity}, count) for severity, count in list(counters.by_severity.items())]),
+            ('speed_camera_last_speed_mph', 'gauge', "Speed of the fastest vehicle in the latest detection",
+             [({}, round(counters.last_speed_mph, 2))])
+        ]
+        if self.motion_gate is not None:
+            families.append(('speed_camera_gate_skip_ratio', 'gauge', "Fraction of frames skipped as idle",
+                             [({}, round(self.motion_gate.skip_ratio, 4))]))
+        return families
+
+    def _border_band(self, shape):
+        """Width of the border drawn inside a frame of this shape, measured once from a rendered mask."""
+        if self._border_shape != shape[:2]:
+            mask = np.zeros(shape[:2], np.uint8)
+            cv2.rectangle(mask, (0, 0), (shape[1]-1, shape[0]-1), 255, self.border_thickness)
+            self._border_px = int(np.count_nonzero(mask[:shape[0] // 2, shape[1] // 2]))
+            self._border_shape = shape[:2]
+        return self._border_px
 
     def _update_display(self, frame, speed_data):
         # Same display logic with added UI thresholds
-        cv2.rectangle(frame, 
-                     (0, 0), 
-                     (frame.shape[1]-1, frame.shape[0]-1),
-                     self.border_color, 
-                     self.border_thickness)
+        t = self.profiler.start()
+        # The border is painted as four slice fills instead of being rasterized every frame
+        band = self._border_band(frame.shape)
+        if band:
+            frame[:band] = self.border_color
+            frame[-band:] = self.border_color
+            frame[:, :band] = self.border_color
+            frame[:, -band:] = self.border_color
         
-        if speed_data and 'bounding_box' in speed_data:
-            x, y, w, h = speed_data['bounding_box']
-            cv2.rectangle(frame, (x,y), (x+w,y+h), (0,0,255), 2)
+        if speed_data:
+            for vehicle in speed_data.get('vehicles', [speed_data]):
+                x, y, w, h = vehicle['bounding_box']
+                cv2.rectangle(frame, (x,y), (x+w,y+h), (0,0,255), 2)
+                cv2.putText(frame, f"{vehicle['speed_mph']:.0f}", (x, max(y - 6, 12)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,0,255), 2)
+        t = self.profiler.lap('boxes', t)
         
         frame = self.overlay.draw_overlay(frame, speed_data, self.warn_thresh, self.danger_thresh)
+        self.profiler.lap('overlay', t)
         return frame
 
-    def process_video_file(self, video_path):
-        cap = cv2.VideoCapture(video_path)
-        prev_time = time.time()
-        
-        cv2.namedWindow(self.window_name, cv2.WND_PROP_FULLSCREEN)
-        cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-        
+    def _record_frame(self, frame, speed_data, timestamp):
+        """Feeds the violation recorder and triggers a clip on danger-level speeds."""
+        if self.recorder is None:
+            return
+        if speed_data and speed_data['speed_mph'] >= speed_data['speed_limit'] + self.danger_thresh:
+            self.recorder.trigger(timestamp, {
+                'time': datetime.now().isoformat(timespec='milliseconds'),
+                'track_id': speed_data['track_id'],
+                'speed_mph': round(speed_data['speed_mph'], 2),
+                'speed_limit': speed_data['speed_limit'],
+                'bounding_box': [int(v) for v in speed_data['bounding_box']]
+            })
+        self.recorder.push(frame, timestamp)
+
+    def _save_trajectories(self, name):
+        """Writes the observations logged since the last save to <trajectory_dir>/<name>.npz."""
+        if self.trajectories is None or not self.trajectories.count:
+            return None
+        meta = {
+            'source': name,
+            'frame_size': [self.config['frame_width'], self.config['frame_height']],
+            'calibration_distance': self.calibration_distance,
+            'calibration_px_per_m': self.calibration_px_per_m,
+            'car_width_m': self.car_width_m,
+            'calibration_factor': self.config['calibration_factor'],
+            'min_speed_threshold': self.config['min_speed_threshold'],
+            'kalman_accel_std': self.config['kalman_accel_std'],
+            'kalman_measurement_std_px': self.config['kalman_measurement_std_px'],
+            'kalman_measurement_std_m': self.config['kalman_measurement_std_m'],
+            'kalman_min_observations': self.min_observations,
+            'speed_confidence': self.config['speed_confidence']
+        }
+        homography = self.ground_calibration.homography if self.ground_calibration is not None else None
+        path = os.path.join(self.config['trajectory_dir'], f"{name}.npz")
+        self.trajectories.save(path, meta, homography)
+        self.trajectories.clear()
+        return path
+
+    def _dispatch_alerts(self, speed_data, timestamp):
+        """Queues one event per speeding vehicle, and again if its severity escalates."""
+        if self.alerts is None or not speed_data:
+            return
+        levels = ('normal', 'warning', 'danger')
+        for vehicle in speed_data['vehicles']:
+            if vehicle['speed_mph'] <= vehicle['speed_limit']:
+                continue
+            severity = self.overlay.get_speed_severity(
+                vehicle['speed_mph'], vehicle['speed_limit'], self.warn_thresh, self.danger_thresh)
+            previous = self._alerted.get(vehicle['track_id'])
+            if previous is not None and levels.index(severity) <= levels.index(previous):
+                continue
+            self._alerted[vehicle['track_id']] = severity
+            self.alerts.submit({
+                'time': datetime.now().isoformat(timespec='milliseconds'),
+                'timestamp': round(timestamp, 3),
+                'track_id': vehicle['track_id'],
+                'speed_mph': round(vehicle['speed_mph'], 2),
+                'speed_ci_mph': round(vehicle['speed_ci_mph'], 2),
+                'speed_limit': vehicle['speed_limit'],
+                'severity': severity,
+                'bounding_box': [int(v) for v in vehicle['bounding_box']]
+            })
+        if len(self._alerted) > 256:
+            live = {track.track_id for track in self.tracker.tracks}
+            self._alerted = {k: v for k, v in self._alerted.items() if k in live}
+
+    def _start_services(self):
+        """Background publishers that live as long as a live session."""
+        if self.alerts is not None:
+            self._alerted.clear()
+            self.alerts.start()
+        if self.metrics is not None:
+            self.metrics.start()
+
+    def _stop_services(self):
+        if self.metrics is not None:
+            self.metrics.stop()
+        if self.alerts is not None:
+            self.alerts.close()
+            print(f"Alerts: {self.alerts.summary()}")
+
+    def _report_gate(self):
+        if self.motion_gate is not None:
+            print(f"Motion gate: skipped {self.motion_gate.skip_ratio:.1%} of "
+                  f"{self.motion_gate.frames} frames")
+
+    def _open_display(self):
+        if self.live_view is not None:
+            self.live_view.start()
+        if self.show_window:
+            cv2.namedWindow(self.window_name, cv2.WND_PROP_FULLSCREEN)
+            cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+    def _close_display(self):
+        if self.live_view is not None:
+            self.live_view.stop()
+        if self.show_window:
+            cv2.destroyAllWindows()
+
+    def _show_frame(self, frame):
+        """Shows a frame and handles keys; returns False when the user asked to quit."""
+        if self.live_view is not None:
+            self.live_view.publish(frame)
+        if not self.show_window:
+            return True
+        t = self.profiler.start()
+        cv2.imshow(self.window_name, frame)
+        key = cv2.waitKey(1) & 0xFF
+        self.profiler.lap('imshow', t)
+        if key == ord('p'):
+            self.profiler.toggle()
+        return key != ord('q')
+
+    def _read_timed_frames(self, cap, start_s=0.0):
+        """
+        Yields (frame_index, timestamp, frame_time, frame) for every decoded frame,
+        optionally seeking to start_s first.
+        Timing comes from the container rather than the wall clock, so measured
+        speeds do not depend on how fast the host decodes or displays.
+        """
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not fps > 0:
+            fps = 30.0
+        nominal_frame_time = 1.0 / fps
+        prev_timestamp = None
+        frame_index = 0
+        if start_s > 0:
+            cap.set(cv2.CAP_PROP_POS_MSEC, start_s * 1000.0)
+            frame_index = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+
         while cap.isOpened() and self.running.value:
             ret, frame = cap.read()
             if not ret:
                 break
-            
-            current_time = time.time()
-            frame_time = current_time - prev_time
-            prev_time = current_time
-            
-            speed_data = self._process_frame(frame, frame_time)
+
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            # Some backends report 0 or repeated positions; fall back to the nominal rate
+            if prev_timestamp is not None and timestamp <= prev_timestamp:
+                timestamp = prev_timestamp + nominal_frame_time
+            frame_time = timestamp - prev_timestamp if prev_timestamp is not None else nominal_frame_time
+            prev_timestamp = timestamp
+
+            yield frame_index, timestamp, frame_time, frame
+            frame_index += 1
+
+    def _detection_params(self):
+        """Everything that can change the detections made on a given video."""
+        return {
+            'config': {key: self.config[key] for key in _DETECTION_CONFIG_KEYS},
+            'detection_zone': list(self.detection_zone),
+            'contour_area': [self.min_contour_area, self.max_contour_area],
+            'background': [self.background_model, self.background_params],
+            'diff_threshold': self.diff_threshold,
+            'analysis_scale': self.analysis_scale,
+            'calibration': [self.calibration_distance, self.calibration_px_per_m, self.car_width_m],
+            'ground_homography': (self.ground_calibration.homography.tolist()
+                                  if self.ground_calibration is not None else None)
+        }
+
+    def _result_cache_key(self, video_path):
+        return ResultCache.key(file_fingerprint(video_path), config_fingerprint(self._detection_params()))
+
+    def _detection_records(self, frame_index, timestamp, speed_data):
+        records = []
+        for vehicle in speed_data['vehicles']:
+            x, y, w, h = vehicle['bounding_box']
+            records.append({
+                'frame': frame_index,
+                'time_s': round(timestamp, 3),
+                'track_id': vehicle['track_id'],
+                'speed_mph': round(vehicle['speed_mph'], 2),
+                'speed_kmh': round(vehicle['speed_kmh'], 2),
+                'speed_ci_mph': round(vehicle['speed_ci_mph'], 2),
+                'bounding_box': [int(x), int(y), int(w), int(h)]
+            })
+        return records
+
+    def process_video_file(self, video_path, headless=False, results_path=None, quiet=False, use_cache=True):
+        """
+        Runs detection over a recorded video. In headless mode nothing is rendered,
+        frames are processed as fast as they decode and the detections are written
+        to a JSON results file (Results/<video name>.json by default).
+        Results are cached by video content and detection settings; a video seen
+        before with the same settings returns instantly unless use_cache is False
+        or clips or trajectories are being recorded (they need the frames).
+        Returns the results dictionary, or None if the file could not be opened.
+        """
+        cache_key = None
+        if self.result_cache is not None and os.path.isfile(video_path):
+            cache_key = self._result_cache_key(video_path)
+            if use_cache and self.recorder is None and self.trajectories is None:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    cached['video'] = video_path
+                    cached['cached'] = True
+                    self._write_results(video_path, cached, headless, results_path, quiet)
+                    return cached
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            print(f"Error: Could not open '{video_path}'")
+            return None
+
+        if not headless:
+            self._open_display()
+
+        detections = []
+        frames = 0
+        duration = 0.0
+        skipped_before = self.motion_gate.skipped if self.motion_gate is not None else 0
+        completed = True
+        start_time = time.perf_counter()
+
+        for frame_index, timestamp, frame_time, frame in self._read_timed_frames(cap):
+            frame_start = time.perf_counter()
+            frames += 1
+            duration = timestamp
+            speed_data = self._process_frame(frame, frame_time, timestamp)
+            if speed_data:
+                detections.extend(self._detection_records(frame_index, timestamp, speed_data))
+
+            if headless:
+                self._record_frame(frame, speed_data, timestamp)
+                self.profiler.frame_done(frame_start)
+                continue
+
             display_frame = self._update_display(frame, speed_data)
-            
-            cv2.imshow(self.window_name, display_frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            self._record_frame(display_frame, speed_data, timestamp)
+            keep_going = self._show_frame(display_frame)
+            self.profiler.frame_done(frame_start)
+            if not keep_going:
+                completed = False
                 break
-        
+
         cap.release()
-        cv2.destroyAllWindows()
+        if not headless:
+            self._close_display()
+        if self.recorder is not None:
+            self.recorder.flush()
+        self._save_trajectories(os.path.splitext(os.path.basename(video_path))[0])
+
+        elapsed = time.perf_counter() - start_time
+        results = {
+            'video': video_path,
+            'frames': frames,
+            'duration_s': round(duration, 3),
+            'processing_s': round(elapsed, 3),
+            'detections': detections
+        }
+        if self.motion_gate is not None:
+            results['gate_skip_ratio'] = round((self.motion_gate.skipped - skipped_before) / max(frames, 1), 4)
+
+        # Only complete runs are cached; a run stopped early has partial detections
+        if cache_key is not None and completed and self.running.value:
+            self.result_cache.put(cache_key, results)
+        self._write_results(video_path, results, headless, results_path, quiet)
+        return results
+
+    def _write_results(self, video_path, results, headless, results_path, quiet):
+        """Writes headless results to Results/<video name>.json (or results_path) and reports them."""
+        if not headless:
+            if results.get('cached') and not quiet:
+                print(f"{os.path.basename(video_path)}: cached results, {len(results['detections'])} detections")
+            return
+        if results_path is None:
+            name = os.path.splitext(os.path.basename(video_path))[0]
+            results_path = os.path.join(self.config['results_dir'], f"{name}.json")
+        os.makedirs(os.path.dirname(results_path) or '.', exist_ok=True)
+        with open(results_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        if quiet:
+            return
+        if results.get('cached'):
+            print(f"{os.path.basename(video_path)}: cached results, "
+                  f"{len(results['detections'])} detections -> {results_path}")
+        else:
+            frames, elapsed = results['frames'], results['processing_s']
+            print(f"{os.path.basename(video_path)}: {frames} frames in {elapsed:.1f}s "
+                  f"({frames / max(elapsed, 1e-6):.1f} fps), {len(results['detections'])} detections -> {results_path}")
+
+    def process_video_segment(self, video_path, start_s, end_s=None, warmup_s=0.0, trajectory_name=None):
+        """
+        Headless detection over [start_s, end_s) of a video. Decoding starts
+        warmup_s earlier so the background model and frame differencing have
+        settled by start_s; detections made during the warm-up are discarded.
+        With trajectory_name, the segment's track observations (warm-up
+        excluded) are saved under that name.
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return None
+
+        detections = []
+        frames = 0
+        warming_up = True
+        for frame_index, timestamp, frame_time, frame in self._read_timed_frames(cap, max(0.0, start_s - warmup_s)):
+            if end_s is not None and timestamp >= end_s:
+                break
+            if warming_up and timestamp >= start_s:
+                # The previous segment already logged the warm-up frames
+                warming_up = False
+                if self.trajectories is not None:
+                    self.trajectories.clear()
+            frames += 1
+            speed_data = self._process_frame(frame, frame_time, timestamp)
+            if speed_data and not warming_up:
+                detections.extend(self._detection_records(frame_index, timestamp, speed_data))
+        cap.release()
+
+        return {
+            'start_s': start_s,
+            'end_s': end_s,
+            'frames': frames,
+            'detections': detections,
+            'trajectories': self._save_trajectories(trajectory_name) if trajectory_name else None
+        }
+
+    def _luma_plane(self, frame):
+        """Y plane of a YUV420 camera frame, as a view (no copy)."""
+        return frame[:self.config['frame_height'], :self.config['frame_width']]
+
+    def _to_bgr(self, frame):
+        """Colour image of a camera frame, for display and recording."""
+        return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420 if self.luma else cv2.COLOR_RGB2BGR)
+
+    def _detection_view(self, frame):
+        """
+        The Y plane detection reads in place: of the lores frame in dual-stream
+        mode, of the main frame in luma mode.
+        """
+        if self.dual_stream:
+            width, height = self.lores_size
+            return frame[:height, :width]
+        return self._luma_plane(frame)
+
+    def _color_frame(self, frame, main=None):
+        """BGR image at full resolution for display and recording, built only on demand."""
+        if not self.dual_stream:
+            return self._to_bgr(frame)
+        if main is not None:
+            return self._to_bgr(main)
+        # Only the lores frame is at hand (main was not requested in time); upscale it
+        lores = cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+        return cv2.resize(lores, (self.config['frame_width'], self.config['frame_height']),
+                          interpolation=cv2.INTER_LINEAR)
+
+    def _needs_color(self):
+        """Whether anything will look at this frame's pixels: window, stream viewers or clip recorder."""
+        if self.show_window or (self.live_view is not None and self.live_view.clients > 0):
+            return True
+        if self.recorder is None:
+            return False
+        # With dual streams, evidence frames are only kept while a vehicle is being
+        # tracked, which covers the whole approach of any violating vehicle
+        return not self.dual_stream or bool(self.tracker.tracks)
+
+    def _main_frame_shape(self):
+        """Shape of a main-stream frame as make_array returns it (see _open_camera)."""
+        if self.luma:
+            # YUV420: full-size Y plane followed by quarter-size U and V planes
+            return (self.config['frame_height'] * 3 // 2, self.config['frame_width'])
+        # XBGR8888, 4 bytes per pixel
+        return (self.config['frame_height'], self.config['frame_width'], 4)
+
+    def _detect_stream(self):
+        return 'lores' if self.dual_stream else 'main'
+
+    def _start_camera(self):
+        self.picam2 = _open_camera(self.config)
 
     def run_live_camera(self):
-        self.picam2 = Picamera2()
-        config = self.picam2.create_preview_configuration(
-            main={"size": (self.config['frame_width'], self.config['frame_height'])},
-            transform=Transform(vflip=True),
-            controls={"FrameDurationLimits": (33333, 33333)}
-        )
-        self.picam2.configure(config)
-        self.picam2.start()
-        time.sleep(2)
-        prev_time = time.time()
+        if self.config['live_pipeline']:
+            return self.run_live_camera_pipelined()
+
+        self._start_camera()
+        # Single-threaded loop: every captured frame is processed and rendered
+        stats = PipelineStats(self.config['pipeline_late_ms'] / 1000.0)
+        self.pipeline_stats = stats
+        self._start_services()
         
-        cv2.namedWindow(self.window_name, cv2.WND_PROP_FULLSCREEN)
-        cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        self._open_display()
         
         try:
             while self.running.value:
-                current_time = time.time()
-                frame_time = current_time - prev_time
-                prev_time = current_time
-                
-                frame = self.picam2.capture_array()
-                frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                speed_data = self._process_frame(frame_bgr, frame_time)
-                display_frame = self._update_display(frame_bgr, speed_data)
+                t = self.profiler.start()
+                frame, main, sensor_time = _capture_with_timestamp(
+                    self.picam2, self._detect_stream(), self.dual_stream and self._needs_color())
+                capture_time = time.perf_counter()
+                stats.captured += 1
+                self.profiler.lap('capture', t)
+                if self.deferred_color:
+                    speed_data = self._process_frame(self._detection_view(frame), timestamp=sensor_time,
+                                                     prescaled=self.dual_stream)
+                else:
+                    frame_bgr = self._to_bgr(frame)
+                    speed_data = self._process_frame(frame_bgr, timestamp=sensor_time)
+                stats.processed += 1
+                self._dispatch_alerts(speed_data, sensor_time)
                 
-                cv2.imshow(self.window_name, display_frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    self.running.value = False
+                # Nothing is drawn while no window, viewer or recorder wants the frame
+                if self._needs_color():
+                    if self.deferred_color:
+                        frame_bgr = self._color_frame(frame, main)
+                    display_frame = self._update_display(frame_bgr, speed_data)
+                    self._record_frame(display_frame, speed_data, capture_time)
+                    if not self._show_frame(display_frame):
+                        self.running.value = False
+                    stats.record_render(capture_time)
+                self.profiler.frame_done(capture_time)
                     
         finally:
             self.picam2.stop()
-            cv2.destroyAllWindows()
+            self._close_display()
+            if self.recorder is not None:
+                self.recorder.flush()
+            self._save_trajectories(f"live_{datetime.now():%Y%m%d_%H%M%S}")
+            self._stop_services()
+            self._report_gate()
+
+    def _capture_stage(self, detect_queue, stats):
+        while self.running.value:
+            t = self.profiler.start()
+            frame, main, sensor_time = _capture_with_timestamp(
+                self.picam2, self._detect_stream(), self.dual_stream and self._needs_color())
+            self.profiler.lap('capture', t)
+            detect_queue.put((frame, main, time.perf_counter(), sensor_time, None))
+            stats.captured += 1
+        detect_queue.close()
+
+    def _ring_reader_stage(self, ring, notify, detect_queue, stats):
+        """Stands in for the capture stage when capture runs in its own process."""
+        while self.running.value:
+            try:
+                slot, seq, sensor_time, main_ref = notify.get(timeout=0.5)
+            except Empty:
+                continue
+            main = None
+            if main_ref is not None:
+                # Main frames are rare and rendered late, so they are copied out
+                # and kept only if the slot was not rewritten meanwhile
+                main = self._main_ring.view(main_ref[0]).copy()
+                if not self._main_ring.is_current(*main_ref):
+                    main = None
+            # Detection frames are passed on as views into the ring; nothing is copied here
+            detect_queue.put((ring.view(slot), main, float(ring.timestamps[slot]), sensor_time, (slot, seq)))
+            stats.captured = ring.written
+        detect_queue.close()
+
+    def _detection_stage(self, detect_queue, render_queue, stats):
+        while True:
+            item = detect_queue.get(timeout=0.5)
+            if item is None:
+                if not self.running.value:
+                    break
+                continue
+            frame, main, capture_time, sensor_time, ring_ref = item
+            if self.deferred_color:
+                # Detection reads the Y plane in place; colour is left to the render stage
+                detect_frame = self._detection_view(frame)
+            else:
+                frame = detect_frame = self._to_bgr(frame)
+                # The conversion leaves a private copy; discard it if the slot was
+                # overwritten by the capture process while being read
+                if ring_ref is not None and not self._ring.is_current(*ring_ref):
+                    stats.torn += 1
+                    continue
+
+            # Speeds use the sensor timestamp, so time spent queueing or frames
+            # dropped upstream do not distort them
+            speed_data = self._process_frame(detect_frame, timestamp=sensor_time, prescaled=self.dual_stream)
+            if self._want_main is not None:
+                # Tells the capture process whether to pass main frames on
+                self._want_main.value = self._needs_color()
+            if self.deferred_color and ring_ref is not None:
+                # The slot may be rewritten before the render stage gets to it, so
+                # colour is produced here, where the check below still covers it
+                frame = self._color_frame(frame, main) if self._needs_color() else None
+                if not self._ring.is_current(*ring_ref):
+                    # The slot was rewritten while being read in place; drop its result
+                    stats.torn += 1
+                    continue
+            self._dispatch_alerts(speed_data, sensor_time)
+            render_queue.put((frame, main, speed_data, capture_time))
+            stats.processed += 1
+        render_queue.close()
+
+    def run_live_camera_pipelined(self):
+        """Live detection with capture, detection and rendering on separate stages.
+
+        Capture and detection run on worker threads (OpenCV releases the GIL)
+        while rendering stays on the main thread as required by the HighGUI backends.
+        """
+        queue_size = self.config['pipeline_queue_size']
+        detect_queue = DropOldestQueue(queue_size)
+        render_queue = DropOldestQueue(queue_size)
+        stats = PipelineStats(self.config['pipeline_late_ms'] / 1000.0)
+        self.pipeline_stats = stats
+        self._queues = {'detect': detect_queue, 'render': render_queue}
+
+        capture_process = None
+        self._ring = self._main_ring = self._want_main = None
+        if self.config['pipeline_capture_process']:
+            slots = self.config['shared_ring_slots']
+            main_spec = None
+            if self.dual_stream:
+                # Detection frames come from the lores stream; main frames go
+                # through a second ring, written only while the parent asks for them
+                self._ring = SharedFrameRing((self.lores_size[1] * 3 // 2, self.lores_size[0]), np.uint8, slots)
+                self._main_ring = SharedFrameRing(self._main_frame_shape(), np.uint8, slots)
+                self._want_main = Value('b', False)
+                main_spec = self._main_ring.spec()
+            else:
+                self._ring = SharedFrameRing(self._main_frame_shape(), np.uint8, slots)
+            notify = Queue()
+            capture_process = Process(target=_capture_process_main,
+                                      args=(self.config, self._ring.spec(), main_spec, self._want_main,
+                                            notify, self.running),
+                                      daemon=True)
+            capture_process.start()
+            capture_worker = Thread(target=self._ring_reader_stage, name="ring-reader",
+                                    args=(self._ring, notify, detect_queue, stats), daemon=True)
+        else:
+            self._start_camera()
+            capture_worker = Thread(target=self._capture_stage, name="capture",
+                                    args=(detect_queue, stats), daemon=True)
+
+        self._open_display()
+
+        workers = [
+            capture_worker,
+            Thread(target=self._detection_stage, name="detection",
+                   args=(detect_queue, render_queue, stats), daemon=True)
+        ]
+        self._start_services()
+        for worker in workers:
+            worker.start()
+
+        try:
+            while self.running.value:
+                item = render_queue.get(timeout=0.5)
+                if capture_process is not None and not capture_process.is_alive() and self.running.value:
+                    raise RuntimeError(f"Capture process exited unexpectedly (exit code {capture_process.exitcode})")
+                # A stage that raised has ended (its traceback is already printed);
+                # waiting on its queue would hang without ever reaching the 'q' key
+                for worker in workers:
+                    if not worker.is_alive() and self.running.value:
+                        raise RuntimeError(f"Pipeline stage '{worker.name}' stopped unexpectedly")
+                if item is None:
+                    continue
+                frame, main, speed_data, capture_time = item
+                stats.dropped_before_detection = detect_queue.dropped
+                stats.dropped_before_render = render_queue.dropped
+                # Nothing is drawn while no window, viewer or recorder wants the frame
+                if frame is None or not self._needs_color():
+                    self.profiler.frame_done(capture_time)
+                    continue
+                if self.deferred_color and self._ring is None:
+                    # Frames from the shared ring were already converted by the detection stage
+                    frame = self._color_frame(frame, main)
+                display_frame = self._update_display(frame, speed_data)
+                self._record_frame(display_frame, speed_data, capture_time)
+
+                if not self._show_frame(display_frame):
+                    self.running.value = False
+                stats.record_render(capture_time)
+                self.profiler.frame_done(capture_time)
+        finally:
+            self.running.value = False
+            for worker in workers:
+                worker.join(timeout=2)
+            if capture_process is not None:
+                capture_process.join(timeout=5)
+                self._ring.close()
+                if self._main_ring is not None:
+                    self._main_ring.close()
+            else:
+                self.picam2.stop()
+            self._close_display()
+            if self.recorder is not None:
+                self.recorder.flush()
+            self._save_trajectories(f"live_{datetime.now():%Y%m%d_%H%M%S}")
+            self._stop_services()
+            self._report_gate()
+            stats.dropped_before_detection = detect_queue.dropped
+            stats.dropped_before_render = render_queue.dropped
+            self._queues = {}
+            print(f"Pipeline: {stats.summary()}")
+
+    def grab_calibration_frame(self, video_path=None):
+        """First frame of a video, or a single live camera frame when no path is given."""
+        if video_path:
+            cap = cv2.VideoCapture(video_path)
+            ret, frame = cap.read()
+            cap.release()
+            return frame if ret else None
+        picam2 = _open_camera(self.config)
+        try:
+            return self._to_bgr(picam2.capture_array())
+        finally:
+            picam2.stop()
+
+    def calibrate_ground_plane(self, frame):
+        """
+        Lets the user click four or more road points on frame and enter their
+        road coordinates in meters, then caches the homography and lookup table.
+        """
+        window = "Ground Plane Calibration"
+        points = []
+
+        def on_mouse(event, x, y, flags, param):
+            if event == cv2.EVENT_LBUTTONDOWN:
+                points.append((x, y))
+
+        cv2.namedWindow(window)
+        cv2.setMouseCallback(window, on_mouse)
+        print("Click four or more road points with known positions.")
+        print("Press Enter when done, 'u' to undo the last point, 'q' to cancel.")
+        while True:
+            view = frame.copy()
+            for i, (x, y) in enumerate(points, 1):
+                cv2.circle(view, (x, y), 5, (0, 0, 255), -1)
+                cv2.putText(view, str(i), (x + 8, y - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            cv2.imshow(window, view)
+            key = cv2.waitKey(30) & 0xFF
+            if key == ord('q'):
+                cv2.destroyWindow(window)
+                return None
+            if key == ord('u') and points:
+                points.pop()
+            if key in (13, 10) and len(points) >= 4:
+                break
+        cv2.destroyWindow(window)
+
+        world = []
+        for i, (x, y) in enumerate(points, 1):
+            while True:
+                try:
+                    raw = input(f"Point {i} at pixel ({x}, {y}) - road position in meters 'X Y': ")
+                    X, Y = (float(v) for v in raw.replace(',', ' ').split())
+                    break
+                except ValueError:
+                    print("Please enter two numbers, e.g. '3.5 12'")
+            world.append((X, Y))
+
+        try:
+            calibration = GroundPlaneCalibration.from_points(points, world, (frame.shape[1], frame.shape[0]))
+        except ValueError as e:
+            print(f"Calibration failed: {e}")
+            return None
+        calibration.save(self.config['ground_calibration'])
+        print(f"Calibration saved to {self.config['ground_calibration']} "
+              f"(reprojection error {calibration.reprojection_error():.3f} m)")
+
+        self.ground_calibration = calibration
+        self.tracker.filter_params = self._filter_params()
+        self.reset_detection_state()
+        return calibration
 
     def show_config_ui(self):
         root = tk.Tk()
@@ -351,28 +1444,289 @@ class SpeedCameraSystem:
             self.warn_thresh = root.warn_thresh
             self.danger_thresh = root.danger_thresh
 
+def _lores_size(config):
+    """Lores stream size: lores_width wide with main's aspect ratio, both even for YUV420."""
+    width = int(config['lores_width']) // 2 * 2
+    height = int(round(config['frame_height'] * width / config['frame_width'])) // 2 * 2
+    return width, height
+
+def _open_camera(config):
+    if Picamera2 is None:
+        raise RuntimeError("picamera2 is not installed; live camera mode is unavailable")
+    picam2 = Picamera2()
+    # XBGR8888 is Picamera2's preview default, named here because the shared
+    # ring is sized from it; the bytes are R, G, B, X, hence COLOR_RGB2BGR
+    main = {"size": (config['frame_width'], config['frame_height']),
+            "format": "YUV420" if config['luma_detection'] else "XBGR8888"}
+    streams = {}
+    if config['dual_stream']:
+        # The ISP scales lores in hardware; YUV420 is the format every Pi supports for it
+        streams['lores'] = {"size": _lores_size(config), "format": "YUV420"}
+    camera_config = picam2.create_preview_configuration(
+        main=main,
+        **streams,
+        transform=Transform(vflip=True),
+        controls={"FrameDurationLimits": (33333, 33333)}
+    )
+    picam2.configure(camera_config)
+    picam2.start()
+    time.sleep(2)
+    return picam2
+
+def _capture_with_timestamp(picam2, stream='main', with_main=False):
+    """
+    Captures one frame of stream with its SensorTimestamp from the request
+    metadata, in seconds; returns (frame, main frame or None, timestamp).
+    The timestamp is taken at exposure, so it is unaffected by how late the
+    frame is read or processed. The main frame of the same request is copied
+    out only when with_main is set.
+    """
+    request = picam2.capture_request()
+    try:
+        frame = request.make_array(stream)
+        main = request.make_array('main') if with_main and stream != 'main' else None
+        sensor_ns = request.get_metadata().get('SensorTimestamp')
+    finally:
+        request.release()
+    return frame, main, (sensor_ns / 1e9 if sensor_ns else time.monotonic())
+
+def _capture_process_main(config, ring_spec, main_ring_spec, want_main, notify, running):
+    """
+    Capture process: writes frames into the shared ring and announces
+    (slot, seq, sensor time, main ref). With dual streams the ring holds lores
+    frames, and while want_main is set the main frame of the same request goes
+    to the main ring, announced as (slot, seq); otherwise main ref is None.
+    """
+    ring = SharedFrameRing.attach(ring_spec)
+    main_ring = SharedFrameRing.attach(main_ring_spec) if main_ring_spec else None
+    picam2 = _open_camera(config)
+    try:
+        while running.value:
+            frame, main, sensor_time = _capture_with_timestamp(
+                picam2, 'lores' if config['dual_stream'] else 'main', main_ring is not None and want_main.value)
+            # The rings keep the local capture time for latency accounting
+            now = time.perf_counter()
+            slot, seq = ring.write(frame, now)
+            main_ref = main_ring.write(main, now) if main is not None else None
+            notify.put((slot, seq, sensor_time, main_ref))
+    finally:
+        picam2.stop()
+        ring.close()
+        if main_ring is not None:
+            main_ring.close()
+
+# Each pool worker owns one SpeedCameraSystem (and so one background model)
+_worker_system = None
+
+def _init_batch_worker(speed_limit, warn_thresh, danger_thresh):
+    global _worker_system
+    # One OpenCV thread per worker; parallelism comes from the pool itself
+    cv2.setNumThreads(1)
+    _worker_system = SpeedCameraSystem()
+    _worker_system.speed_limit = speed_limit
+    _worker_system.warn_thresh = warn_thresh
+    _worker_system.danger_thresh = danger_thresh
+
+def _analyze_video_worker(video_path):
+    _worker_system.reset_detection_state()
+    try:
+        results = _worker_system.process_video_file(video_path, headless=True, quiet=True)
+    except Exception as e:
+        return {'video': video_path, 'error': str(e)}
+    if results is None:
+        return {'video': video_path, 'error': "could not open video"}
+    return results
+
+def _analyze_segment_worker(job):
+    video_path, start_s, end_s, warmup_s, trajectory_name = job
+    _worker_system.reset_detection_state()
+    return _worker_system.process_video_segment(video_path, start_s, end_s, warmup_s, trajectory_name)
+
+def _stitch_segments(segment_results, frame_period):
+    """
+    Joins per-segment detections in time order. Seeking is not always frame
+    exact, so a frame reported by two neighbouring segments is kept only once.
+    """
+    tagged = []
+    for index, segment in enumerate(segment_results):
+        tagged.extend((d['time_s'], index, d) for d in segment['detections'])
+    tagged.sort(key=lambda t: (t[0], t[1]))
+
+    stitched = []
+    last_time = None
+    last_segment = None
+    for time_s, index, detection in tagged:
+        if (last_time is not None and index != last_segment
+                and time_s - last_time < frame_period / 2):
+            continue
+        # Track ids restart in every segment
+        detection['segment'] = index
+        stitched.append(detection)
+        last_time = time_s
+        last_segment = index
+    return stitched
+
+def analyze_video_in_segments(video_path, system, segments=None, warmup_s=None, processes=None, results_path=None):
+    """
+    Splits one long video into time segments analysed in parallel, each with
+    a warm-up overlap, and stitches the detections back into one results file.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"Error: Could not open '{video_path}'")
+        return None
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if not fps > 0:
+        fps = 30.0
+    duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+    cap.release()
+
+    processes = processes or system.config.get('batch_processes') or os.cpu_count() or 1
+    warmup_s = system.config['segment_warmup_s'] if warmup_s is None else warmup_s
+    segments = segments or processes
+    # Segments shorter than their own warm-up would spend most of their time re-decoding
+    segments = max(1, min(segments, int(duration // max(warmup_s, 1.0))))
+    bounds = [duration * i / segments for i in range(segments)] + [None]
+    # Track ids restart in every segment, so each saves its own trajectory file
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    jobs = [(video_path, bounds[i], bounds[i + 1], warmup_s, f"{name}_seg{i}") for i in range(segments)]
+
+    print(f"Analyzing {os.path.basename(video_path)} ({duration:.0f}s) as {segments} segments "
+          f"with {warmup_s:.0f}s warm-up on {processes} worker processes...")
+    start_time = time.perf_counter()
+    with Pool(processes, initializer=_init_batch_worker,
+              initargs=(system.speed_limit, system.warn_thresh, system.danger_thresh)) as pool:
+        segment_results = pool.map(_analyze_segment_worker, jobs, chunksize=1)
+    elapsed = time.perf_counter() - start_time
+
+    if any(r is None for r in segment_results):
+        print(f"Error: Could not open '{video_path}' in a worker")
+        return None
+
+    results = {
+        'video': video_path,
+        'frames': int(round(duration * fps)),
+        'duration_s': round(duration, 3),
+        'processing_s': round(elapsed, 3),
+        'segments': segments,
+        'warmup_s': warmup_s,
+        'detections': _stitch_segments(segment_results, 1.0 / fps)
+    }
+    trajectory_files = [r['trajectories'] for r in segment_results if r['trajectories']]
+    if trajectory_files:
+        results['trajectories'] = trajectory_files
+    if results_path is None:
+        results_path = os.path.join(system.config['results_dir'], f"{name}.json")
+    os.makedirs(os.path.dirname(results_path) or '.', exist_ok=True)
+    with open(results_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Done in {elapsed:.1f}s ({duration / max(elapsed, 1e-6):.1f}x real time), "
+          f"{len(results['detections'])} detections -> {results_path}")
+    return results
+
+def analyze_video_directory(video_files, system, processes=None, report_path=None):
+    """
+    Analyzes every video headless across a multiprocessing pool and writes one
+    aggregated report. Per-file results stream back as workers finish them.
+    """
+    processes = processes or system.config.get('batch_processes') or os.cpu_count() or 1
+    if report_path is None:
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        report_path = os.path.join(system.config['results_dir'], f"report_{stamp}.json")
+
+    files = []
+    total_frames = 0
+    total_detections = 0
+    # Throughput only counts videos actually decoded, not result cache hits
+    decoded_frames = 0
+    decoded_files = 0
+    cache_hits = 0
+    start_time = time.perf_counter()
+    print(f"Analyzing {len(video_files)} videos with {processes} worker processes...")
+
+    with Pool(processes, initializer=_init_batch_worker,
+              initargs=(system.speed_limit, system.warn_thresh, system.danger_thresh)) as pool:
+        for done, result in enumerate(pool.imap_unordered(_analyze_video_worker, video_files), 1):
+            files.append(result)
+            elapsed = max(time.perf_counter() - start_time, 1e-6)
+            name = os.path.basename(result['video'])
+            if 'error' in result:
+                print(f"[{done}/{len(video_files)}] {name}: FAILED ({result['error']})")
+                continue
+
+            total_frames += result['frames']
+            total_detections += len(result['detections'])
+            if result.get('cached'):
+                cache_hits += 1
+            else:
+                decoded_frames += result['frames']
+                decoded_files += 1
+            print(f"[{done}/{len(video_files)}] {name}: {result['frames']} frames, "
+                  f"{len(result['detections'])} detections{' (cached)' if result.get('cached') else ''} | "
+                  f"{decoded_frames / elapsed:.1f} frames/s, {decoded_files / elapsed:.2f} files/s")
+
+    elapsed = max(time.perf_counter() - start_time, 1e-6)
+    report = {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'processes': processes,
+        'videos': len(video_files),
+        'failed': sum(1 for f in files if 'error' in f),
+        'cache_hits': cache_hits,
+        'frames': total_frames,
+        'detections': total_detections,
+        'wall_s': round(elapsed, 3),
+        'frames_per_s': round(decoded_frames / elapsed, 2),
+        'files_per_s': round(decoded_files / elapsed, 4),
+        'files': sorted(files, key=lambda f: f['video'])
+    }
+    os.makedirs(os.path.dirname(report_path) or '.', exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Done: {total_frames} frames, {total_detections} detections in {elapsed:.1f}s "
+          f"({report['frames_per_s']} frames/s decoded, {cache_hits} cache hits) -> {report_path}")
+    return report
+
 if __name__ == "__main__":
     system = SpeedCameraSystem()
     
     print("Select mode:")
     print("1. Live Camera Detection")
     print("2. Process Video Files from Videos directory")
-    choice = input("Enter choice (1 or 2): ")
+    print("3. Analyze a Video File headless (results to file)")
+    print("4. Analyze all Video Files in parallel (aggregated report)")
+    print("5. Analyze one long Video File in parallel segments")
+    print("6. Calibrate ground plane")
+    choice = input("Enter choice (1-6): ")
     
-    system.show_config_ui()
+    if choice == "6":
+        video_path = input("Video file to calibrate from (blank for live camera): ").strip()
+        frame = system.grab_calibration_frame(video_path or None)
+        if frame is None:
+            print("Error: Could not read a frame to calibrate from")
+        else:
+            system.calibrate_ground_plane(frame)
+        exit()
+    
+    # The Tk settings dialog needs a display too; headless poles use config.json
+    if system.show_window:
+        system.show_config_ui()
     
     if choice == "1":
         system.run_live_camera()
-    elif choice == "2":
+    elif choice in ("2", "3", "4", "5"):
         video_dir = "Videos"
         if not os.path.exists(video_dir):
             print(f"Error: Directory '{video_dir}' not found!")
             exit()
             
-        video_files = [f for f in os.listdir(video_dir) if f.endswith('.mp4')]
+        video_files = sorted(f for f in os.listdir(video_dir) if f.endswith('.mp4'))
         if not video_files:
             print(f"No .mp4 files found in '{video_dir}'")
             exit()
+
+        if choice == "4":
+            analyze_video_directory([os.path.join(video_dir, f) for f in video_files], system)
+            exit()
             
         print(f"Found {len(video_files)} video files:")
         for i, f in enumerate(video_files, 1):
@@ -380,6 +1734,9 @@ if __name__ == "__main__":
             
         vid_choice = int(input("Select video file (number): ")) - 1
         selected_video = os.path.join(video_dir, video_files[vid_choice])
-        system.process_video_file(selected_video)
+        if choice == "5":
+            analyze_video_in_segments(selected_video, system)
+        else:
+            system.process_video_file(selected_video, headless=(choice == "3"))
     else:
-        print("Invalid choice!")
\ No newline at end of file
+        print("Invalid choice!")
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class StageProfiler:
+    """
+    Rolling per-stage latency recorder for the frame loop.
+
+    Stages are timed with start()/lap() pairs that pass the previous timestamp
+    along explicitly, so the capture, detection and render threads can share
+    one profiler. While disabled both calls return immediately, which keeps
+    the cost of leaving the instrumentation in place close to zero.
+    """
+
+    def __init__(self, enabled=False, window=600, dump_interval=10.0, dump_path=None):
+        self.enabled = enabled
+        self.window = window
+        self.dump_interval = dump_interval
+        self.dump_path = dump_path
+        self._samples = {}
+        self._frame_times = deque(maxlen=window)
+        self._last_dump = time.perf_counter()
+        self._dump_lock = threading.Lock()
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self._last_dump = time.perf_counter()
+        print(f"Profiling {'enabled' if self.enabled else 'disabled'}")
+
+    def reset(self):
+        self._samples = {}
+        self._frame_times.clear()
+
+    def start(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def _record(self, stage, seconds):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples.setdefault(stage, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def lap(self, stage, since):
+        """Records the time since `since` against stage and returns the new mark."""
+        if not self.enabled:
+            return 0.0
+        now = time.perf_counter()
+        # A zero mark means profiling was switched on mid-frame
+        if since:
+            self._record(stage, now - since)
+        return now
+
+    def frame_done(self, capture_time):
+        """Records end-to-end latency for a frame captured at capture_time (perf_counter clock)."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._record('end_to_end', now - capture_time)
+        self._frame_times.append(now)
+        if self.dump_interval and now - self._last_dump >= self.dump_interval:
+            self.dump()
+
+    def snapshot(self):
+        """Returns {'fps': ..., 'stages': {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms}}}."""
+        stages = {}
+        for stage, samples in list(self._samples.items()):
+            values = np.fromiter(list(samples), dtype=np.float64) * 1000.0
+            if not len(values):
+                continue
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            stages[stage] = {
+                'count': len(values),
+                'mean_ms': round(float(values.mean()), 3),
+                'p50_ms': round(float(p50), 3),
+                'p95_ms': round(float(p95), 3),
+                'p99_ms': round(float(p99), 3)
+            }
+        frame_times = list(self._frame_times)
+        fps = None
+        if len(frame_times) > 1 and frame_times[-1] > frame_times[0]:
+            fps = round((len(frame_times) - 1) / (frame_times[-1] - frame_times[0]), 2)
+        return {'fps': fps, 'stages': stages}
+
+    def dump(self):
+        if not self._dump_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_dump = time.perf_counter()
+            snapshot = self.snapshot()
+            summary = ", ".join(f"{stage} {s['p50_ms']:.1f}/{s['p95_ms']:.1f}/{s['p99_ms']:.1f}"
+                                for stage, s in snapshot['stages'].items())
+            print(f"Profile (p50/p95/p99 ms) fps={snapshot['fps']}: {summary}")
+            if self.dump_path:
+                os.makedirs(os.path.dirname(self.dump_path) or '.', exist_ok=True)
+                snapshot['time'] = time.time()
+                with open(self.dump_path, 'a') as f:
+                    f.write(json.dumps(snapshot) + "\n")
+        finally:
+            self._dump_lock.release()
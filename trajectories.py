@@ -0,0 +1,272 @@
+import json
+import os
+from statistics import NormalDist
+
+import numpy as np
+
+# Per-observation columns stored in a trajectory file
+COLUMNS = ('track_id', 'timestamp', 'box', 'centroid', 'zone')
+
+
+class TrajectoryLog:
+    """
+    Raw per-frame observations of every tracked vehicle, kept column by column.
+
+    Boxes (x, y, w, h) and centroids are in full-frame pixels, zone is the
+    detection zone (x1, y1, x2, y2) the observation was made in. Saved as one
+    compressed .npz so speeds can be re-derived later without decoding video.
+    """
+
+    def __init__(self, capacity=4096):
+        self._allocate(max(1, int(capacity)))
+        self.count = 0
+
+    def _allocate(self, capacity):
+        self.track_id = np.empty(capacity, np.int32)
+        self.timestamp = np.empty(capacity, np.float64)
+        self.box = np.empty((capacity, 4), np.int32)
+        self.centroid = np.empty((capacity, 2), np.float32)
+        self.zone = np.empty((capacity, 4), np.int32)
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in COLUMNS}
+        self._allocate(2 * len(self.timestamp))
+        for name, column in old.items():
+            getattr(self, name)[:self.count] = column[:self.count]
+
+    def append(self, timestamp, tracks, zone):
+        """Adds one observation for each track seen in the frame at timestamp."""
+        x1, y1 = zone[0], zone[1]
+        for track in tracks:
+            if self.count == len(self.timestamp):
+                self._grow()
+            i = self.count
+            x, y, w, h = track.box
+            _, cx, cy = track.history[-1]
+            self.track_id[i] = track.track_id
+            self.timestamp[i] = timestamp
+            self.box[i] = (x1 + x, y1 + y, w, h)
+            self.centroid[i] = (x1 + cx, y1 + cy)
+            self.zone[i] = zone
+            self.count += 1
+
+    def clear(self):
+        self.count = 0
+
+    def save(self, path, meta, homography=None):
+        """
+        Writes the observations with a JSON metadata record (calibration
+        constants and tracker settings in effect) and the ground-plane
+        homography, if one was used.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        columns = {name: getattr(self, name)[:self.count] for name in COLUMNS}
+        np.savez_compressed(
+            path,
+            meta=np.array(json.dumps(meta)),
+            homography=np.asarray(homography if homography is not None else np.empty((0, 3)), np.float64),
+            **columns
+        )
+
+
+def load_trajectories(paths):
+    """
+    Concatenates trajectory files into one set of columns. The added 'file'
+    column indexes into the returned 'meta' and 'homography' lists.
+    """
+    columns = {name: [] for name in COLUMNS}
+    files, metas, homographies = [], [], []
+    for index, path in enumerate(paths):
+        with np.load(path) as data:
+            for name in COLUMNS:
+                columns[name].append(data[name])
+            files.append(np.full(len(data['timestamp']), index, np.int32))
+            meta = json.loads(str(data['meta']))
+            meta['path'] = path
+            metas.append(meta)
+            homography = data['homography']
+            homographies.append(homography if homography.size else None)
+    if not files:
+        raise ValueError("No trajectory files given")
+
+    merged = {name: np.concatenate(parts) for name, parts in columns.items()}
+    merged['file'] = np.concatenate(files)
+    merged['meta'] = metas
+    merged['homography'] = homographies
+    return merged
+
+
+def _per_file(data, key, override):
+    """Per-observation array of a metadata value, or of the override when given."""
+    if override is not None:
+        return np.full(len(data['file']), float(override))
+    values = np.array([meta[key] for meta in data['meta']], np.float64)
+    return values[data['file']]
+
+
+def _ground_positions(data, use_ground_plane):
+    """
+    Road-plane positions (meters) of the box contact points for files saved
+    with a homography, NaN elsewhere. Contacts are rounded to whole pixels to
+    match the lookup table used during detection.
+    """
+    positions = np.full((len(data['file']), 2), np.nan)
+    if not use_ground_plane:
+        return positions
+    box = data['box'].astype(np.float64)
+    for index, homography in enumerate(data['homography']):
+        if homography is None:
+            continue
+        rows = data['file'] == index
+        width, height = data['meta'][index]['frame_size']
+        x = np.clip(np.rint(box[rows, 0] + box[rows, 2] / 2.0), 0, width - 1)
+        y = np.clip(np.rint(box[rows, 1] + box[rows, 3]), 0, height - 1)
+        h = homography
+        denom = h[2, 0] * x + h[2, 1] * y + h[2, 2]
+        positions[rows, 0] = (h[0, 0] * x + h[0, 1] * y + h[0, 2]) / denom
+        positions[rows, 1] = (h[1, 0] * x + h[1, 1] * y + h[1, 2]) / denom
+    return positions
+
+
+def recompute_speeds(data, calibration_factor=None, car_width_m=None, accel_std=None,
+                     measurement_std_px=None, measurement_std_m=None, min_observations=None,
+                     min_speed_threshold=None, confidence=None, max_speed=60.0, use_ground_plane=True):
+    """
+    Re-runs the tracker's speed filter over loaded trajectories with new
+    calibration or smoothing parameters; anything left as None keeps the value
+    each file was recorded with.
+
+    The constant-velocity Kalman filter of the live tracker is evaluated for
+    every track at once: tracks are sorted by length and step k updates the
+    k-th observation of all tracks that have one, so the Python loop runs
+    over the longest track rather than over observations.
+
+    Returns the observations in (file, track, time) order with 'speed_mph' and
+    'speed_ci_mph' (NaN where the detector would not report a speed), plus a
+    'tracks' summary with the start time and maximum speed of each track.
+    """
+    order = np.lexsort((data['timestamp'], data['track_id'], data['file']))
+    file = data['file'][order]
+    track_id = data['track_id'][order]
+    timestamp = data['timestamp'][order]
+    box = data['box'][order]
+    n = len(order)
+    if n == 0:
+        raise ValueError("Trajectory files contain no observations")
+    sorted_data = {'file': file, 'box': box, 'meta': data['meta'], 'homography': data['homography']}
+
+    new_track = np.ones(n, bool)
+    new_track[1:] = (file[1:] != file[:-1]) | (track_id[1:] != track_id[:-1])
+    starts = np.flatnonzero(new_track)
+    lengths = np.diff(np.append(starts, n))
+
+    # Filter inputs: road meters with 1 unit per meter when calibrated,
+    # otherwise the centroid with the width-based px/m estimate
+    ground = _ground_positions(sorted_data, use_ground_plane)
+    calibrated = ~np.isnan(ground[:, 0])
+    positions = np.where(calibrated[:, None], ground, data['centroid'][order].astype(np.float64))
+
+    car_width = _per_file(sorted_data, 'car_width_m', car_width_m)
+    ref_distance = _per_file(sorted_data, 'calibration_distance', None)
+    ref_px_per_m = _per_file(sorted_data, 'calibration_px_per_m', None)
+    widths = box[:, 2].astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        distances = (ref_distance * ref_px_per_m) / (widths / car_width)
+        px_per_meter = ref_px_per_m * (ref_distance / distances)
+    px_per_meter[~(distances < 50)] = np.nan
+    # A track keeps its last usable estimate; before the first one it uses the reference
+    last_valid = np.where(~np.isnan(px_per_meter) | new_track, np.arange(n), 0)
+    px_per_meter = px_per_meter[np.maximum.accumulate(last_valid)]
+    px_per_meter = np.where(np.isnan(px_per_meter), ref_px_per_m, px_per_meter)
+    px_per_meter[calibrated] = 1.0
+
+    accel = _per_file(sorted_data, 'kalman_accel_std', accel_std)
+    measurement_var = np.where(calibrated,
+                               _per_file(sorted_data, 'kalman_measurement_std_m', measurement_std_m),
+                               _per_file(sorted_data, 'kalman_measurement_std_px', measurement_std_px)) ** 2
+
+    # Longest tracks first, so the tracks still active at step k are a prefix
+    by_length = np.argsort(-lengths, kind='stable')
+    track_rows = starts[by_length]
+    sorted_lengths = lengths[by_length]
+    active_counts = np.searchsorted(-sorted_lengths, -np.arange(sorted_lengths[0]), side='left')
+
+    rows = track_rows
+    m_var = measurement_var[rows]
+    vel_var = (max_speed * px_per_meter[rows]) ** 2
+    # Per axis: position, velocity, covariance p00, p01, p11
+    state = [[positions[rows, axis].copy(), np.zeros(len(rows)), m_var.copy(),
+              np.zeros(len(rows)), vel_var.copy()] for axis in (0, 1)]
+
+    speed = np.empty(n)
+    speed_std = np.empty(n)
+
+    def record(rows, count):
+        vx, vy = state[0][1][:count], state[1][1][:count]
+        vx_var, vy_var = state[0][4][:count], state[1][4][:count]
+        ppm = px_per_meter[rows]
+        speed_sq = vx * vx + vy * vy
+        moving = speed_sq > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var = np.where(moving, (vx * vx * vx_var + vy * vy * vy_var) / speed_sq,
+                           np.maximum(vx_var, vy_var))
+        speed[rows] = np.sqrt(speed_sq) / ppm
+        speed_std[rows] = np.sqrt(var) / ppm
+
+    record(rows, len(rows))
+    for k in range(1, len(active_counts)):
+        count = active_counts[k]
+        rows = track_rows[:count] + k
+        dt = timestamp[rows] - timestamp[rows - 1]
+        # Observations without elapsed time are kept but do not step the filter
+        step = dt > 0
+        dt = np.where(step, dt, 0.0)
+        q = (accel[rows] * px_per_meter[rows]) ** 2
+        dt2 = dt * dt
+        for axis, s in enumerate(state):
+            p, v, p00, p01, p11 = (column[:count] for column in s)
+            pp = p + v * dt
+            pp00 = p00 + 2 * dt * p01 + dt2 * p11 + q * dt2 * dt / 3
+            pp01 = p01 + dt * p11 + q * dt2 / 2
+            pp11 = p11 + q * dt
+            innovation_var = pp00 + m_var[:count]
+            k0 = pp00 / innovation_var
+            k1 = pp01 / innovation_var
+            residual = positions[rows, axis] - pp
+            p[:] = np.where(step, pp + k0 * residual, p)
+            v[:] = np.where(step, v + k1 * residual, v)
+            p00[:] = np.where(step, (1 - k0) * pp00, p00)
+            p01[:] = np.where(step, (1 - k0) * pp01, p01)
+            p11[:] = np.where(step, pp11 - k1 * pp01, p11)
+        record(rows, count)
+
+    # Same reporting rules as the live detector
+    observation = np.arange(n) - np.repeat(starts, lengths)
+    min_obs = _per_file(sorted_data, 'kalman_min_observations', min_observations)
+    min_mph = _per_file(sorted_data, 'min_speed_threshold', min_speed_threshold)
+    factor = _per_file(sorted_data, 'calibration_factor', calibration_factor)
+    level = _per_file(sorted_data, 'speed_confidence', confidence)
+    levels, level_index = np.unique(level, return_inverse=True)
+    z = np.array([NormalDist().inv_cdf(0.5 + c / 2) for c in levels])[level_index]
+
+    speed_mph = speed * 2.23694
+    reported = (observation + 1 >= min_obs) & (speed_mph > min_mph)
+    speed_mph = np.where(reported, speed_mph * factor, np.nan)
+    ci_mph = np.where(reported, z * speed_std * 2.23694 * factor, np.nan)
+
+    with np.errstate(invalid='ignore'):
+        max_speed_mph = np.fmax.reduceat(speed_mph, starts)
+    return {
+        'file': file,
+        'track_id': track_id,
+        'timestamp': timestamp,
+        'speed_mph': speed_mph,
+        'speed_ci_mph': ci_mph,
+        'tracks': {
+            'file': file[starts],
+            'track_id': track_id[starts],
+            'start_s': timestamp[starts],
+            'observations': lengths,
+            'max_speed_mph': max_speed_mph
+        }
+    }
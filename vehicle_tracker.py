@@ -0,0 +1,121 @@
+import math
+from collections import deque
+
+import numpy as np
+
+from kalman_filter import ConstantVelocityKalman
+
+
+class VehicleTrack:
+    """State of one vehicle followed across frames."""
+
+    def __init__(self, track_id, timestamp, box, centroid, position, px_per_meter, filter_params, history=30):
+        self.track_id = track_id
+        self.box = tuple(int(v) for v in box)
+        # Units of `position` per meter: the blob's px/m for image positions,
+        # 1.0 when positions are already road-plane meters
+        self.px_per_meter = px_per_meter
+        # (timestamp, cx, cy) in full-resolution zone pixels
+        self.history = deque([(timestamp, float(centroid[0]), float(centroid[1]))], maxlen=history)
+        self.filter = ConstantVelocityKalman(position[0], position[1], px_per_meter, **filter_params)
+        self.hits = 1
+        self.missed = 0
+
+    def predicted_centroid(self, timestamp):
+        # Association stays in image space whatever units the filter runs in
+        last_time, cx, cy = self.history[-1]
+        if len(self.history) < 2:
+            return cx, cy
+        prev_time, px, py = self.history[-2]
+        span = last_time - prev_time
+        if span <= 0:
+            return cx, cy
+        dt = timestamp - last_time
+        return cx + (cx - px) / span * dt, cy + (cy - py) / span * dt
+
+    def update(self, timestamp, box, centroid, position, px_per_meter):
+        prev_time = self.history[-1][0]
+        self.history.append((timestamp, float(centroid[0]), float(centroid[1])))
+        self.box = tuple(int(v) for v in box)
+        self.hits += 1
+        self.missed = 0
+        if not math.isnan(px_per_meter):
+            self.px_per_meter = px_per_meter
+
+        dt = timestamp - prev_time
+        if dt > 0:
+            self.filter.step(dt, position[0], position[1], self.px_per_meter)
+
+    def speed(self):
+        """Returns (speed, standard deviation) in m/s."""
+        return self.filter.speed(self.px_per_meter)
+
+
+class VehicleTracker:
+    """
+    Associates blobs with tracks frame to frame by predicted-centroid distance.
+    Matching is greedy over the track x blob cost matrix, cheapest pairs first,
+    which is effectively linear for the handful of vehicles in the zone.
+    """
+
+    def __init__(self, max_distance=150.0, max_missed=5, default_px_per_meter=85.0, filter_params=None):
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.default_px_per_meter = default_px_per_meter
+        self.filter_params = filter_params or {}
+        self.tracks = []
+        self._next_id = 1
+
+    def reset(self):
+        self.tracks = []
+        self._next_id = 1
+
+    def update(self, timestamp, boxes, centroids, px_per_meter, positions=None):
+        """
+        Feeds one frame of blobs (Nx4 boxes, Nx2 centroids, N px/m estimates with
+        NaN where unknown) and returns the tracks that were seen in this frame.
+        positions optionally gives the Nx2 points fed to the speed filter, e.g.
+        road-plane meters with px_per_meter of 1; by default the centroids are used.
+        """
+        if positions is None:
+            positions = centroids
+        n_tracks = len(self.tracks)
+        n_blobs = len(boxes)
+        track_matched = np.zeros(n_tracks, dtype=bool)
+        blob_matched = np.zeros(n_blobs, dtype=bool)
+        seen = []
+
+        if n_tracks and n_blobs:
+            predicted = np.array([t.predicted_centroid(timestamp) for t in self.tracks])
+            cost = np.linalg.norm(predicted[:, None, :] - centroids[None, :, :], axis=2)
+            track_idx, blob_idx = np.unravel_index(np.argsort(cost, axis=None), cost.shape)
+            for t, b in zip(track_idx, blob_idx):
+                if cost[t, b] > self.max_distance:
+                    break
+                if track_matched[t] or blob_matched[b]:
+                    continue
+                track_matched[t] = True
+                blob_matched[b] = True
+                track = self.tracks[t]
+                track.update(timestamp, boxes[b], centroids[b], positions[b], px_per_meter[b])
+                seen.append(track)
+
+        survivors = []
+        for track, matched in zip(self.tracks, track_matched):
+            if not matched:
+                track.missed += 1
+            if track.missed <= self.max_missed:
+                survivors.append(track)
+        self.tracks = survivors
+
+        for b in np.flatnonzero(~blob_matched):
+            initial = px_per_meter[b]
+            if math.isnan(initial):
+                initial = self.default_px_per_meter
+            track = VehicleTrack(self._next_id, timestamp, boxes[b], centroids[b], positions[b],
+                                 initial, self.filter_params)
+            self._next_id += 1
+            self.tracks.append(track)
+            seen.append(track)
+
+        return seen
@@ -0,0 +1,205 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from frame_pipeline import DropOldestQueue
+
+
+class ViolationRecorder:
+    """
+    Keeps the last few seconds of frames as JPEGs in a bounded ring buffer and,
+    when a violation is triggered, saves a clip spanning pre_seconds before to
+    post_seconds after the event together with a snapshot and a JSON sidecar.
+
+    push() and trigger() only hand work off: JPEG compression runs on a
+    compressor thread and clip encoding and disk I/O on a writer thread, so
+    the detection loop is never blocked. If either thread falls behind, frames
+    (or whole clips) are dropped and counted rather than queued without bound.
+
+    The ring and the open clip share one max_buffer_mb budget: their frames are
+    the same JPEG bytes, so a frame counts once while either holds it. Raw
+    frames waiting for compression sit outside the budget, which is why at
+    most input_frames of them are queued.
+    """
+
+    def __init__(self, output_dir, pre_seconds=5.0, post_seconds=5.0, max_buffer_mb=64,
+                 jpeg_quality=85, fps=30.0, pending_clips=4, input_frames=2):
+        self.output_dir = output_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_buffer_bytes = int(max_buffer_mb * 1024 * 1024)
+        self.jpeg_quality = jpeg_quality
+        self.fps = fps
+
+        self.clips_dropped = 0
+        self.clips_written = 0
+
+        self._input = DropOldestQueue(max(1, int(input_frames)))
+        self._writes = queue.Queue(maxsize=pending_clips)
+        self._lock = threading.Lock()
+        self._ring = deque()
+        self._ring_bytes = 0
+        self._event = None
+        self._threads = None
+        self._pushed = 0
+        self._handled = 0
+
+    def _start(self):
+        self._threads = [
+            threading.Thread(target=self._compress_loop, daemon=True),
+            threading.Thread(target=self._write_loop, daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def push(self, frame, timestamp):
+        """Queues a frame for the ring buffer. The frame must not be modified afterwards."""
+        if self._threads is None:
+            self._start()
+        self._pushed += 1
+        self._input.put((timestamp, frame))
+
+    def trigger(self, timestamp, info):
+        """Starts a clip around timestamp unless one is already being captured."""
+        with self._lock:
+            if self._event is not None:
+                return False
+            self._event = {
+                'trigger_time': timestamp,
+                'info': info,
+                'frames': list(self._ring),
+                # Bytes of clip frames already evicted from the ring, and the
+                # next clip frame the ring will evict
+                'own_bytes': 0,
+                'evict_index': 0,
+                'snapshot': None
+            }
+        return True
+
+    def flush(self):
+        """Waits for queued frames, closes any open clip early and waits for pending writes."""
+        if self._threads is None:
+            return
+        while self._handled + self._input.dropped < self._pushed:
+            time.sleep(0.01)
+        with self._lock:
+            self._finish_event()
+            self._ring.clear()
+            self._ring_bytes = 0
+        self._writes.join()
+
+    @property
+    def frames_dropped(self):
+        return self._input.dropped
+
+    def _buffered_bytes(self):
+        """JPEG bytes held by the ring and the open clip together."""
+        return self._ring_bytes + (self._event['own_bytes'] if self._event is not None else 0)
+
+    def _evict_oldest(self):
+        item = self._ring.popleft()
+        self._ring_bytes -= len(item[1])
+        event = self._event
+        if event is not None:
+            frames = event['frames']
+            # Clip frames leave the ring in order; from now on only the clip holds them
+            if event['evict_index'] < len(frames) and frames[event['evict_index']] is item:
+                event['own_bytes'] += len(item[1])
+                event['evict_index'] += 1
+
+    def _finish_event(self):
+        event = self._event
+        self._event = None
+        if event is None or not event['frames']:
+            return
+        try:
+            self._writes.put_nowait(event)
+        except queue.Full:
+            self.clips_dropped += 1
+
+    def _compress_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)]
+        while True:
+            item = self._input.get(timeout=0.5)
+            if item is None:
+                continue
+            timestamp, frame = item
+            ok, encoded = cv2.imencode('.jpg', frame, params)
+            if not ok:
+                self._handled += 1
+                continue
+            data = encoded.tobytes()
+
+            with self._lock:
+                self._handled += 1
+                item = (timestamp, data)
+                event = self._event
+                if event is not None:
+                    if timestamp <= event['trigger_time'] + self.post_seconds:
+                        if event['snapshot'] is None and timestamp >= event['trigger_time']:
+                            event['snapshot'] = data
+                        # Everything buffered belongs to the clip by now, so once the
+                        # budget is full the clip simply stops growing
+                        if self._buffered_bytes() + len(data) <= self.max_buffer_bytes:
+                            event['frames'].append(item)
+                    else:
+                        self._finish_event()
+
+                # The ring keeps running during an event (sharing the same frames)
+                # so a following violation still gets its pre-roll
+                self._ring.append(item)
+                self._ring_bytes += len(data)
+                while self._ring and (self._buffered_bytes() > self.max_buffer_bytes
+                                      or self._ring[0][0] < timestamp - self.pre_seconds):
+                    self._evict_oldest()
+
+    def _write_loop(self):
+        while True:
+            event = self._writes.get()
+            try:
+                self._write_clip(event)
+                self.clips_written += 1
+            except Exception as e:
+                print(f"Violation recorder: failed to write clip ({e})")
+            finally:
+                self._writes.task_done()
+
+    def _write_clip(self, event):
+        os.makedirs(self.output_dir, exist_ok=True)
+        info = event['info']
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        base = os.path.join(self.output_dir, f"violation_{stamp}_{info.get('speed_mph', 0):.0f}mph")
+
+        frames = event['frames']
+        snapshot = event['snapshot'] or frames[-1][1]
+        with open(base + ".jpg", 'wb') as f:
+            f.write(snapshot)
+
+        span = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / span if len(frames) > 1 and span > 0 else self.fps
+        first = cv2.imdecode(np.frombuffer(frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+        height, width = first.shape[:2]
+        writer = cv2.VideoWriter(base + ".mp4", cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        try:
+            writer.write(first)
+            for _, data in frames[1:]:
+                writer.write(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+        finally:
+            writer.release()
+
+        with open(base + ".json", 'w') as f:
+            json.dump({
+                'trigger_time': event['trigger_time'],
+                'clip_start': frames[0][0],
+                'clip_end': frames[-1][0],
+                'frames': len(frames),
+                'fps': round(fps, 2),
+                'violation': info
+            }, f, indent=2)